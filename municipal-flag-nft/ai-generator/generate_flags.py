@@ -5,8 +5,9 @@ This script generates flag images using Stable Diffusion.
 Supports both local generation and cloud APIs (Replicate, Stability AI).
 """
 import os
-import json
 import time
+import tempfile
+import orjson
 from pathlib import Path
 from typing import Optional
 from tqdm import tqdm
@@ -15,9 +16,6 @@ from config import (
     Config, MUNICIPALITIES_DATA, LOCATION_TYPES, CATEGORY_ASSIGNMENT
 )
 
-# Ensure output directories exist
-Config.ensure_directories()
-
 
 def get_prompt_for_flag(municipality: str, region: str, country: str, location_type: str) -> str:
     """Generate a prompt for Stable Diffusion."""
@@ -283,6 +281,8 @@ def generate_all_flags():
     print("Municipal Flag NFT - Image Generator")
     print("=" * 60)
 
+    Config.ensure_directories()
+
     generator = get_generator()
     negative_prompt = get_negative_prompt()
 
@@ -355,12 +355,37 @@ def generate_all_flags():
     print(f"\nImages saved to: {Config.OUTPUT_DIR}")
 
 
+def write_json_atomic(path: Path, data) -> None:
+    """
+    Write JSON to path atomically.
+
+    Serializes once, writes to a temp file in the same directory and
+    renames it into place, so readers never see a half-written file.
+    mkstemp creates the temp file owner-only (0600), so it's given the
+    mode a plain open() would (0666 less the umask) before the rename.
+    """
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    umask = os.umask(0)
+    os.umask(umask)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
 def generate_metadata():
     """Generate metadata JSON files for all flags."""
     print("\n" + "=" * 60)
     print("Generating Metadata Files")
     print("=" * 60)
 
+    Config.ensure_directories()
+
     flag_id = 0
     metadata_list = []
 
@@ -403,8 +428,8 @@ def generate_metadata():
 
                 # Save individual metadata file
                 metadata_path = Config.METADATA_DIR / f"{flag_id}.json"
-                with open(metadata_path, 'w') as f:
-                    json.dump(metadata, f, indent=2)
+                with open(metadata_path, 'wb') as f:
+                    f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
                 metadata_list.append({
                     "flag_id": flag_id,
@@ -415,8 +440,7 @@ def generate_metadata():
 
     # Save combined metadata file
     combined_path = Config.METADATA_DIR / "all_metadata.json"
-    with open(combined_path, 'w') as f:
-        json.dump(metadata_list, f, indent=2)
+    write_json_atomic(combined_path, metadata_list)
 
     print(f"Generated {flag_id} metadata files")
     print(f"Metadata saved to: {Config.METADATA_DIR}")
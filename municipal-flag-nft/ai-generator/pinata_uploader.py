@@ -0,0 +1,282 @@
+"""
+Pinata IPFS client for Municipal Flag NFT Game.
+
+Filesystem/network only - no database imports, so it's cheap to import
+from any script that needs to talk to Pinata. Credentials are read from
+the root .env directly rather than through config.py, since the backend
+has its own `config` module that the upload script also imports.
+"""
+import os
+import threading
+import time
+import httpx
+import orjson
+from pathlib import Path
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+# Load environment
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+# Pinata credentials
+PINATA_JWT = os.getenv("PINATA_JWT", "")
+PINATA_API_KEY = os.getenv("PINATA_API_KEY", "")
+PINATA_API_SECRET = os.getenv("PINATA_API_SECRET", "")
+
+# Retry policies: Pinata's API returns 429 under bursts, and the public
+# gateways rate-limit much harder than the API, so back off longer there
+API_RETRY = {"retries": 3, "backoff": 0.3, "statuses": (429, 502, 503, 504)}
+GATEWAY_RETRY = {"retries": 5, "backoff": 0.5, "statuses": (429, 503)}
+
+
+class PinataUploader:
+    """Simple IPFS uploader using Pinata."""
+
+    def __init__(self):
+        self.base_url = "https://api.pinata.cloud"
+        self.gateway_url = "https://gateway.pinata.cloud/ipfs"
+        self.fallback_gateway_url = "https://ipfs.io/ipfs"
+
+        if not PINATA_JWT and not (PINATA_API_KEY and PINATA_API_SECRET):
+            raise ValueError(
+                "Missing Pinata credentials. Set PINATA_JWT or "
+                "(PINATA_API_KEY + PINATA_API_SECRET) in .env"
+            )
+
+        # Auth headers never change, so build them once
+        if PINATA_JWT:
+            self._auth_headers = {"Authorization": f"Bearer {PINATA_JWT}"}
+        else:
+            self._auth_headers = {
+                "pinata_api_key": PINATA_API_KEY,
+                "pinata_secret_api_key": PINATA_API_SECRET
+            }
+
+        # HTTP clients are created lazily, one per thread (see `client`),
+        # and tracked so close() can shut them all
+        self._local = threading.local()
+        self._clients: List[httpx.Client] = []
+        self._clients_lock = threading.Lock()
+
+    def __enter__(self) -> "PinataUploader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close every thread's HTTP client and its connections."""
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+        self._local = threading.local()
+
+    @property
+    def client(self) -> httpx.Client:
+        """
+        HTTP/2 client for the calling thread.
+
+        Each upload worker gets its own client, so threads never contend
+        on a shared connection pool. A thread sends one request at a time,
+        so nothing is multiplexed across workers; each client just keeps
+        its connection alive between that thread's requests.
+        """
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+                timeout=30.0
+            )
+            self._local.client = client
+            with self._clients_lock:
+                self._clients.append(client)
+        return client
+
+    def _headers(self, for_upload: bool = False) -> Dict[str, str]:
+        """Get request headers."""
+        headers = dict(self._auth_headers)
+
+        if not for_upload:
+            headers["Content-Type"] = "application/json"
+
+        return headers
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        retries: int,
+        backoff: float,
+        statuses: tuple,
+        files: Optional[List] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request, retrying with exponential backoff on the given statuses.
+
+        Pinning is idempotent, so POSTs are safe to retry. Open files in
+        `files` are rewound before each attempt.
+        """
+        for attempt in range(retries + 1):
+            for _, (_, content, _) in files or []:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+
+            response = self.client.request(method, url, files=files, **kwargs)
+            if response.status_code not in statuses or attempt == retries:
+                return response
+
+            time.sleep(backoff * (2 ** attempt))
+
+        return response
+
+    def test_auth(self) -> bool:
+        """Test if credentials are valid."""
+        try:
+            response = self._request(
+                "GET",
+                f"{self.base_url}/data/testAuthentication",
+                headers=self._headers(),
+                **API_RETRY
+            )
+            return response.status_code == 200
+        except:
+            return False
+
+    def get_pinned_files(self) -> Dict[str, str]:
+        """
+        Get everything already pinned on Pinata.
+
+        Returns:
+            Mapping of pin name (the filename for file uploads) -> IPFS hash.
+            Empty if the pin list can't be fetched.
+        """
+        pinned = {}
+        page_limit = 1000
+        offset = 0
+
+        try:
+            while True:
+                response = self._request(
+                    "GET",
+                    f"{self.base_url}/data/pinList",
+                    params={"status": "pinned", "pageLimit": page_limit, "pageOffset": offset},
+                    headers=self._headers(),
+                    **API_RETRY
+                )
+                if response.status_code != 200:
+                    return {}
+
+                rows = response.json().get("rows", [])
+                for row in rows:
+                    name = (row.get("metadata") or {}).get("name")
+                    if name:
+                        pinned[name] = row["ipfs_pin_hash"]
+
+                if len(rows) < page_limit:
+                    return pinned
+                offset += page_limit
+        except:
+            return {}
+
+    def upload_file(self, file_path: Path) -> Optional[str]:
+        """
+        Upload a file to IPFS. Returns IPFS hash or None.
+
+        The caller is expected to have checked the file exists; a missing
+        file fails the open() below and returns None.
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                # httpx streams file objects in chunks rather than building
+                # the whole multipart body in memory
+                response = self._request(
+                    "POST",
+                    f"{self.base_url}/pinning/pinFileToIPFS",
+                    files=[('file', (file_path.name, f, 'application/octet-stream'))],
+                    headers=self._headers(for_upload=True),
+                    **API_RETRY
+                )
+
+                if response.status_code == 200:
+                    return response.json()["IpfsHash"]
+                else:
+                    return None
+        except:
+            return None
+
+    def upload_json(self, data: Dict, name: str) -> Optional[str]:
+        """Upload JSON to IPFS. Returns IPFS hash or None."""
+        try:
+            payload = {
+                "pinataContent": data,
+                "pinataMetadata": {"name": name}
+            }
+
+            response = self._request(
+                "POST",
+                f"{self.base_url}/pinning/pinJSONToIPFS",
+                content=orjson.dumps(payload),
+                headers=self._headers(),
+                **API_RETRY
+            )
+
+            if response.status_code == 200:
+                return response.json()["IpfsHash"]
+            else:
+                return None
+        except:
+            return None
+
+    def upload_json_directory(self, files: Dict[str, Dict], name: str) -> Optional[str]:
+        """
+        Upload many JSON documents as one IPFS directory in a single request.
+
+        Args:
+            files: Filename -> JSON content, e.g. {"1.json": {...}}
+            name: Pin name for the directory
+
+        Returns:
+            Directory CID (each file resolves at <cid>/<filename>) or None
+        """
+        try:
+            # Pinata builds the directory from the path prefix on each file
+            parts = [
+                ('file', (f"{name}/{filename}", orjson.dumps(content), 'application/json'))
+                for filename, content in files.items()
+            ]
+
+            response = self._request(
+                "POST",
+                f"{self.base_url}/pinning/pinFileToIPFS",
+                files=parts,
+                data={'pinataMetadata': orjson.dumps({"name": name}).decode()},
+                headers=self._headers(for_upload=True),
+                **API_RETRY
+            )
+
+            if response.status_code == 200:
+                return response.json()["IpfsHash"]
+            else:
+                return None
+        except:
+            return None
+
+    def is_available(self, ipfs_hash: str) -> bool:
+        """Check that content resolves on the Pinata gateway, falling back to ipfs.io."""
+        for gateway in (self.gateway_url, self.fallback_gateway_url):
+            try:
+                response = self._request(
+                    "HEAD",
+                    f"{gateway}/{ipfs_hash}",
+                    timeout=10,
+                    follow_redirects=True,
+                    **GATEWAY_RETRY
+                )
+                if response.status_code == 200:
+                    return True
+            except:
+                pass
+        return False
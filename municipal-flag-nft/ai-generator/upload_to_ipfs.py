@@ -8,13 +8,16 @@ Simple, clean script that:
 No complicated imports or path juggling.
 """
 import os
+import shutil
+import subprocess
 import sys
-import json
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from tqdm import tqdm
-from dotenv import load_dotenv
+
+from pinata_uploader import PinataUploader
 
 # ============================================================
 # CONFIGURATION
@@ -26,114 +29,38 @@ ROOT_DIR = SCRIPT_DIR.parent
 OUTPUT_DIR = SCRIPT_DIR / "output"
 METADATA_DIR = SCRIPT_DIR / "metadata"
 
-# Load environment
-load_dotenv(ROOT_DIR / ".env")
-
-# Pinata credentials
-PINATA_JWT = os.getenv("PINATA_JWT", "")
-PINATA_API_KEY = os.getenv("PINATA_API_KEY", "")
-PINATA_API_SECRET = os.getenv("PINATA_API_SECRET", "")
+# Concurrent uploads (the work is network-bound, not CPU-bound)
+MAX_WORKERS = int(os.getenv("PINATA_MAX_WORKERS", "8"))
 
+# Gateway checks are tiny HEAD requests, so verify with more workers
+VERIFY_WORKERS = 16
 
-# ============================================================
-# PINATA UPLOADER
-# ============================================================
+# Lossless PNG optimizer, used when installed (https://github.com/shssoichiro/oxipng).
+# Generated PNGs are poorly compressed, and smaller files upload faster.
+OXIPNG = shutil.which("oxipng")
 
-class PinataUploader:
-    """Simple IPFS uploader using Pinata."""
-
-    def __init__(self):
-        self.base_url = "https://api.pinata.cloud"
-
-        if not PINATA_JWT and not (PINATA_API_KEY and PINATA_API_SECRET):
-            raise ValueError(
-                "Missing Pinata credentials. Set PINATA_JWT or "
-                "(PINATA_API_KEY + PINATA_API_SECRET) in .env"
-            )
-
-    def _headers(self, for_upload: bool = False) -> Dict[str, str]:
-        """Get request headers."""
-        if PINATA_JWT:
-            headers = {"Authorization": f"Bearer {PINATA_JWT}"}
-        else:
-            headers = {
-                "pinata_api_key": PINATA_API_KEY,
-                "pinata_secret_api_key": PINATA_API_SECRET
-            }
-
-        if not for_upload:
-            headers["Content-Type"] = "application/json"
-
-        return headers
-
-    def test_auth(self) -> bool:
-        """Test if credentials are valid."""
-        try:
-            response = requests.get(
-                f"{self.base_url}/data/testAuthentication",
-                headers=self._headers()
-            )
-            return response.status_code == 200
-        except:
-            return False
-
-    def upload_file(self, file_path: Path) -> Optional[str]:
-        """Upload a file to IPFS. Returns IPFS hash or None."""
-        if not file_path.exists():
-            return None
-
-        try:
-            with open(file_path, 'rb') as f:
-                files = {'file': (file_path.name, f)}
-
-                response = requests.post(
-                    f"{self.base_url}/pinning/pinFileToIPFS",
-                    files=files,
-                    headers=self._headers(for_upload=True)
-                )
-
-                if response.status_code == 200:
-                    return response.json()["IpfsHash"]
-                else:
-                    return None
-        except:
-            return None
-
-    def upload_json(self, data: Dict, name: str) -> Optional[str]:
-        """Upload JSON to IPFS. Returns IPFS hash or None."""
-        try:
-            payload = {
-                "pinataContent": data,
-                "pinataMetadata": {"name": name}
-            }
-
-            response = requests.post(
-                f"{self.base_url}/pinning/pinJSONToIPFS",
-                json=payload,
-                headers=self._headers()
-            )
-
-            if response.status_code == 200:
-                return response.json()["IpfsHash"]
-            else:
-                return None
-        except:
-            return None
+# Pin name of the metadata directory (each flag is <cid>/<flag_id>.json).
+# Files are keyed by flag ID: the contract's token IDs come from a mint
+# counter, so they don't exist yet when metadata is pinned. tokenURI()
+# (baseURI + tokenId + ".json") therefore can't point into this directory;
+# map tokens to flags with getFlagIdForToken() and use the flag's
+# metadata_ipfs_hash.
+METADATA_DIR_NAME = "flag-metadata"
 
 
 # ============================================================
 # DATABASE ACCESS (ISOLATED)
 # ============================================================
 
-def get_database_connection():
-    """Get database connection. Import here to avoid conflicts."""
+@lru_cache(maxsize=None)
+def _load_backend():
+    """Import the backend database modules once. Import here to avoid conflicts."""
     # Add backend to path
     backend_path = str(ROOT_DIR / "backend")
     if backend_path not in sys.path:
         sys.path.insert(0, backend_path)
 
     # Change to backend directory so database is created there
-    import os
     original_dir = os.getcwd()
     os.chdir(ROOT_DIR / "backend")
 
@@ -144,42 +71,75 @@ def get_database_connection():
 
         # Initialize and return
         init_db()
-        return SessionLocal(), Flag, Municipality, Region, Country
+        return SessionLocal, Flag, Municipality, Region, Country
     finally:
         # Change back to original directory
         os.chdir(original_dir)
 
 
-def get_flags_from_db() -> List[Dict]:
-    """Get all flags from database."""
+def get_database_connection():
+    """Get database connection."""
+    SessionLocal, Flag, Municipality, Region, Country = _load_backend()
+    return SessionLocal(), Flag, Municipality, Region, Country
+
+
+def get_flags_from_db(only_pending: bool = True) -> List[Dict]:
+    """
+    Get flags from database.
+
+    Args:
+        only_pending: If True, only return flags missing an image or
+            metadata hash
+    """
+    from sqlalchemy import or_
+
     db, Flag, Municipality, Region, Country = get_database_connection()
 
     try:
-        flags = db.query(Flag).join(
-            Municipality
+        # Select plain columns across the joins instead of hydrating ORM
+        # objects - the upload only needs these values
+        query = db.query(
+            Flag.id,
+            Flag.name,
+            Flag.location_type,
+            Flag.category,
+            Flag.image_ipfs_hash,
+            Flag.metadata_ipfs_hash,
+            Municipality.name,
+            Region.name,
+            Country.name,
+            Country.code
+        ).join(
+            Municipality, Flag.municipality_id == Municipality.id
         ).join(
-            Region
+            Region, Municipality.region_id == Region.id
         ).join(
-            Country
-        ).all()
+            Country, Region.country_id == Country.id
+        )
 
-        result = []
-        for flag in flags:
-            muni = flag.municipality
-            region = muni.region
-            country = region.country
+        if only_pending:
+            query = query.filter(or_(
+                Flag.image_ipfs_hash.is_(None),
+                Flag.metadata_ipfs_hash.is_(None)
+            ))
 
-            # Image filename pattern: CODE_municipality_ID.png
-            filename = f"{country.code}_{muni.name.lower()}_{flag.id:03d}.png"
+        rows = query.order_by(Flag.id).all()
 
+        result = []
+        for (flag_id, name, location, category, image_hash, metadata_hash,
+             muni_name, region_name, country_name, country_code) in rows:
             result.append({
-                "flag_id": flag.id,
-                "flag": flag,
-                "filename": filename,
-                "country": country.name,
-                "region": region.name,
-                "municipality": muni.name,
-                "location": flag.location_type
+                "flag_id": flag_id,
+                "name": name,
+                # Image filename pattern: CODE_municipality_ID.png
+                "filename": f"{country_code}_{muni_name.lower()}_{flag_id:03d}.png",
+                "country": country_name,
+                "region": region_name,
+                "municipality": muni_name,
+                "location": location,
+                "category": category,
+                "image_ipfs_hash": image_hash,
+                "metadata_ipfs_hash": metadata_hash
             })
 
         return result
@@ -187,18 +147,62 @@ def get_flags_from_db() -> List[Dict]:
         db.close()
 
 
-def update_flag_hashes(flag_id: int, image_hash: str, metadata_hash: str) -> bool:
-    """Update a flag's IPFS hashes in database."""
+def get_uploaded_hashes() -> List[Tuple[int, str, Optional[str]]]:
+    """Get (flag_id, image_hash, metadata_hash) for flags with an uploaded image."""
+    db, Flag, _, _, _ = get_database_connection()
+
+    try:
+        # Only the hash columns - no ORM objects, no joins
+        return [
+            tuple(row) for row in db.query(
+                Flag.id, Flag.image_ipfs_hash, Flag.metadata_ipfs_hash
+            ).filter(
+                Flag.image_ipfs_hash.isnot(None)
+            ).order_by(Flag.id).all()
+        ]
+    finally:
+        db.close()
+
+
+def get_upload_counts() -> Dict[str, int]:
+    """Count flags by upload state using SQL aggregates."""
+    db, Flag, _, _, _ = get_database_connection()
+
+    try:
+        return {
+            "total": db.query(Flag).count(),
+            "with_image": db.query(Flag).filter(Flag.image_ipfs_hash.isnot(None)).count(),
+            "with_metadata": db.query(Flag).filter(Flag.metadata_ipfs_hash.isnot(None)).count(),
+        }
+    finally:
+        db.close()
+
+
+def update_flag_hashes(updates: List[Tuple[int, str, str]]) -> int:
+    """
+    Update IPFS hashes for a batch of flags in one transaction.
+
+    Args:
+        updates: (flag_id, image_hash, metadata_hash) tuples
+
+    Returns:
+        Number of flags updated
+    """
+    if not updates:
+        return 0
+
+    from sqlalchemy import update
+
     db, Flag, _, _, _ = get_database_connection()
 
     try:
-        flag = db.query(Flag).filter(Flag.id == flag_id).first()
-        if flag:
-            flag.image_ipfs_hash = image_hash
-            flag.metadata_ipfs_hash = metadata_hash
-            db.commit()
-            return True
-        return False
+        # ORM bulk UPDATE by primary key: one executemany statement
+        db.execute(update(Flag), [
+            {"id": flag_id, "image_ipfs_hash": image_hash, "metadata_ipfs_hash": metadata_hash}
+            for flag_id, image_hash, metadata_hash in updates
+        ])
+        db.commit()
+        return len(updates)
     finally:
         db.close()
 
@@ -207,6 +211,70 @@ def update_flag_hashes(flag_id: int, image_hash: str, metadata_hash: str) -> boo
 # MAIN UPLOAD LOGIC
 # ============================================================
 
+def optimize_image(image_path: Path) -> None:
+    """
+    Losslessly recompress a PNG in place with oxipng, if it is installed.
+
+    Safe to run repeatedly - oxipng leaves already-optimal files alone.
+    """
+    if not OXIPNG:
+        return
+
+    try:
+        subprocess.run(
+            [OXIPNG, "-o", "4", "--strip", "safe", "--quiet", str(image_path)],
+            check=True
+        )
+    except (subprocess.CalledProcessError, OSError) as e:
+        # Uploading the original file is still fine
+        tqdm.write(f"  ! oxipng failed for {image_path.name}: {e}")
+
+
+def upload_flag(
+    uploader: PinataUploader, item: Dict, pinned: Dict[str, str]
+) -> Tuple[Dict, Optional[str], Optional[str]]:
+    """
+    Upload one flag's image.
+
+    Runs in a worker thread, so it only talks to Pinata and never touches
+    the database. Metadata is uploaded afterwards for all flags at once.
+
+    Args:
+        pinned: Pin name -> IPFS hash of files already on Pinata; images
+            found here are not uploaded again
+
+    Returns:
+        (item, image_hash, error) - error is None on success
+    """
+    # Upload image (unless a previous run already pinned it)
+    image_hash = pinned.get(item["filename"])
+    if not image_hash:
+        image_path = OUTPUT_DIR / item["filename"]
+        optimize_image(image_path)
+        image_hash = uploader.upload_file(image_path)
+    if not image_hash:
+        return item, None, "Upload failed"
+
+    return item, image_hash, None
+
+
+def build_metadata(item: Dict, image_hash: str) -> Dict:
+    """Build a flag's NFT metadata document."""
+    return {
+        "name": f"Flag at {item['name']}",
+        "description": f"{item['location']} flag of {item['municipality']}, {item['region']}, {item['country']}",
+        "image": f"ipfs://{image_hash}",
+        "attributes": [
+            {"trait_type": "Country", "value": item['country']},
+            {"trait_type": "Region", "value": item['region']},
+            {"trait_type": "Municipality", "value": item['municipality']},
+            {"trait_type": "Location", "value": item['location']},
+            {"trait_type": "Category", "value": item['category'].value.title()},
+            {"trait_type": "Flag ID", "value": item['flag_id']}
+        ]
+    }
+
+
 def upload_all(force: bool = False):
     """
     Upload all images to IPFS and update database.
@@ -221,112 +289,187 @@ def upload_all(force: bool = False):
     if force:
         print("FORCE MODE: Re-uploading all images\n")
 
+    if not OXIPNG:
+        print("Note: oxipng not found - uploading PNGs without recompression\n")
+
     # Test Pinata
     print("Testing Pinata credentials...")
-    uploader = PinataUploader()
-    if not uploader.test_auth():
-        print("ERROR: Pinata authentication failed!")
-        return
-    print("✓ Pinata authenticated\n")
-
-    # Get flags from database
-    print("Loading flags from database...")
-    flags = get_flags_from_db()
-
-    if not flags:
-        print("ERROR: No flags in database!")
-        print("Run: curl -X POST http://localhost:8000/api/admin/seed -H 'X-Admin-Key: YOUR_KEY'")
-        return
-
-    print(f"✓ Found {len(flags)} flags\n")
-
-    # Upload
-    print("Uploading to IPFS...")
-    print("-" * 60)
-
-    uploaded = 0
-    skipped = 0
-    failed = 0
+    with PinataUploader() as uploader:
+        if not uploader.test_auth():
+            print("ERROR: Pinata authentication failed!")
+            return
+        print("✓ Pinata authenticated\n")
+
+        # Get flags from database
+        print("Loading flags from database...")
+        total = get_upload_counts()["total"]
+
+        if not total:
+            print("ERROR: No flags in database!")
+            print("Run: curl -X POST http://localhost:8000/api/admin/seed -H 'X-Admin-Key: YOUR_KEY'")
+            return
+
+        # Every flag is loaded, since the metadata directory is re-pinned
+        # with all of them; only pending ones upload images (unless force mode)
+        all_flags = get_flags_from_db(only_pending=False)
+        flags = all_flags if force else [
+            item for item in all_flags
+            if not (item["image_ipfs_hash"] and item["metadata_ipfs_hash"])
+        ]
+        print(f"✓ Found {total} flags ({len(flags)} to upload)\n")
+
+        # Upload
+        print("Uploading to IPFS...")
+        print("-" * 60)
+
+        uploaded = 0
+        skipped = total - len(flags)
+        failed = 0
+
+        # Read the output folder once instead of stat()-ing every image
+        available = set()
+        if OUTPUT_DIR.is_dir():
+            with os.scandir(OUTPUT_DIR) as entries:
+                available = {entry.name for entry in entries if entry.is_file()}
+
+        # Select the flags that need uploading
+        pending = []
+        for item in flags:
+            # Check if image file exists
+            if item["filename"] not in available:
+                tqdm.write(f"  ✗ Missing: {item['filename']}")
+                failed += 1
+                continue
+
+            pending.append(item)
+
+        # Images pinned by an earlier (interrupted) run don't need re-uploading.
+        # Force mode always re-uploads, since the images may have been regenerated.
+        pinned = {}
+        if pending and not force:
+            pinned = uploader.get_pinned_files()
+            if pinned:
+                print(f"✓ Found {len(pinned)} files already pinned on Pinata\n")
+
+        # Upload images in parallel; database updates stay on the main thread
+        image_hashes = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [executor.submit(upload_flag, uploader, item, pinned) for item in pending]
+
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing"):
+                item, image_hash, error = future.result()
+
+                if error:
+                    tqdm.write(f"  ✗ {error}: {item['filename']}")
+                    failed += 1
+                    continue
+
+                image_hashes[item["flag_id"]] = image_hash
+                tqdm.write(f"  ✓ {item['filename']} -> {image_hash[:12]}...")
+
+        # Re-pin the metadata of every flag with an image - not just this
+        # run's - as one directory, so all flags share a single root CID
+        # even after resumed or partial runs: <cid>/<flag_id>.json
+        if image_hashes:
+            current = {
+                item["flag_id"]: (item, image_hashes.get(item["flag_id"], item["image_ipfs_hash"]))
+                for item in all_flags
+                if item["flag_id"] in image_hashes or item["image_ipfs_hash"]
+            }
+            metadata_files = {
+                f"{flag_id}.json": build_metadata(item, image_hash)
+                for flag_id, (item, image_hash) in current.items()
+            }
 
-    for item in tqdm(flags, desc="Processing"):
-        flag = item["flag"]
+            print(f"\nUploading {len(metadata_files)} metadata files...")
+            metadata_root = uploader.upload_json_directory(metadata_files, METADATA_DIR_NAME)
+
+            if metadata_root:
+                # Update database (previously uploaded flags move to the new root)
+                update_flag_hashes([
+                    (flag_id, image_hash, f"{metadata_root}/{flag_id}.json")
+                    for flag_id, (_, image_hash) in current.items()
+                ])
+                uploaded = len(image_hashes)
+                print(f"✓ Metadata directory -> {metadata_root}")
+            else:
+                print("✗ Metadata upload failed")
+                failed += len(image_hashes)
 
-        # Skip if already uploaded (unless force mode)
-        if not force and flag.image_ipfs_hash and flag.metadata_ipfs_hash:
-            skipped += 1
-            continue
+        # Summary
+        print("-" * 60)
+        print("\n" + "=" * 60)
+        print("UPLOAD COMPLETE")
+        print("=" * 60)
+        print(f"  Uploaded: {uploaded}")
+        print(f"  Skipped:  {skipped}")
+        print(f"  Failed:   {failed}")
+        print(f"  Total:    {total}")
+        print()
 
-        # Check if image file exists
-        image_path = OUTPUT_DIR / item["filename"]
-        if not image_path.exists():
-            tqdm.write(f"  ✗ Missing: {item['filename']}")
-            failed += 1
-            continue
 
-        # Upload image
-        image_hash = uploader.upload_file(image_path)
-        if not image_hash:
-            tqdm.write(f"  ✗ Upload failed: {item['filename']}")
-            failed += 1
-            continue
-
-        # Create metadata
-        metadata = {
-            "name": f"Flag at {flag.name}",
-            "description": f"{flag.location_type} flag of {item['municipality']}, {item['region']}, {item['country']}",
-            "image": f"ipfs://{image_hash}",
-            "attributes": [
-                {"trait_type": "Country", "value": item['country']},
-                {"trait_type": "Region", "value": item['region']},
-                {"trait_type": "Municipality", "value": item['municipality']},
-                {"trait_type": "Location", "value": item['location']},
-                {"trait_type": "Category", "value": flag.category.value.title()},
-                {"trait_type": "Flag ID", "value": flag.id}
-            ]
-        }
+def show_status():
+    """Show current upload status."""
+    print("=" * 60)
+    print("IPFS Upload Status")
+    print("=" * 60)
 
-        # Upload metadata
-        metadata_hash = uploader.upload_json(metadata, f"flag_{flag.id}_metadata.json")
-        if not metadata_hash:
-            tqdm.write(f"  ✗ Metadata upload failed: {item['filename']}")
-            failed += 1
-            continue
-
-        # Update database
-        if update_flag_hashes(flag.id, image_hash, metadata_hash):
-            uploaded += 1
-            tqdm.write(f"  ✓ {item['filename']} -> {image_hash[:12]}...")
-        else:
-            tqdm.write(f"  ✗ DB update failed: {item['filename']}")
-            failed += 1
+    # Only counts are needed, so let the database do them
+    counts = get_upload_counts()
 
-    # Summary
-    print("-" * 60)
-    print("\n" + "=" * 60)
-    print("UPLOAD COMPLETE")
-    print("=" * 60)
-    print(f"  Uploaded: {uploaded}")
-    print(f"  Skipped:  {skipped}")
-    print(f"  Failed:   {failed}")
-    print(f"  Total:    {len(flags)}")
+    print(f"\nTotal flags:      {counts['total']}")
+    print(f"Uploaded:         {counts['with_image']}")
+    print(f"With metadata:    {counts['with_metadata']}")
+    print(f"Pending upload:   {counts['total'] - counts['with_image']}")
     print()
 
 
-def show_status():
-    """Show current upload status."""
+def verify_uploads():
+    """Check that every uploaded image and metadata file resolves on IPFS."""
     print("=" * 60)
-    print("IPFS Upload Status")
+    print("IPFS Upload Verification")
     print("=" * 60)
 
-    flags = get_flags_from_db()
+    with PinataUploader() as uploader:
+        counts = get_upload_counts()
+        uploaded = get_uploaded_hashes()
 
-    with_hashes = sum(1 for f in flags if f["flag"].image_ipfs_hash)
-    without = len(flags) - with_hashes
+        print(f"\nUploaded:         {counts['with_image']}")
+        print(f"Pending upload:   {counts['total'] - counts['with_image']}")
 
-    print(f"\nTotal flags:      {len(flags)}")
-    print(f"Uploaded:         {with_hashes}")
-    print(f"Pending upload:   {without}")
-    print()
+        if not uploaded:
+            print("\nNo uploaded flags to verify.")
+            print()
+            return
+
+        # One check per stored hash
+        checks = []
+        for flag_id, image_hash, metadata_hash in uploaded:
+            checks.append((f"flag {flag_id} image", image_hash))
+            if metadata_hash:
+                checks.append((f"flag {flag_id} metadata", metadata_hash))
+
+        print(f"\nChecking {len(checks)} files on the IPFS gateway...")
+
+        available = 0
+        missing = 0
+        with ThreadPoolExecutor(max_workers=VERIFY_WORKERS) as executor:
+            futures = {
+                executor.submit(uploader.is_available, ipfs_hash): (name, ipfs_hash)
+                for name, ipfs_hash in checks
+            }
+
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Verifying"):
+                name, ipfs_hash = futures[future]
+                if future.result():
+                    available += 1
+                else:
+                    missing += 1
+                    tqdm.write(f"  ✗ Not reachable: {name} ({ipfs_hash})")
+
+        print(f"\nAvailable:        {available}")
+        print(f"Not reachable:    {missing}")
+        print()
 
 
 # ============================================================
@@ -341,6 +484,8 @@ if __name__ == "__main__":
             upload_all(force=True)
         elif cmd == "--status":
             show_status()
+        elif cmd == "--verify":
+            verify_uploads()
         elif cmd == "--help":
             print("Usage: python upload_to_ipfs.py [OPTIONS]")
             print()
@@ -348,6 +493,7 @@ if __name__ == "__main__":
             print("  (none)    Upload flags without IPFS hashes")
             print("  --force   Re-upload ALL flags (overwrite existing)")
             print("  --status  Show upload status")
+            print("  --verify  Check uploaded files resolve on the IPFS gateway")
             print("  --help    Show this help")
         else:
             print(f"Unknown option: {cmd}")
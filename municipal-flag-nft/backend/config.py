@@ -4,7 +4,7 @@ Reads all settings from the root .env file.
 """
 import os
 from pathlib import Path
-from functools import lru_cache
+from functools import lru_cache, cached_property
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -29,6 +29,10 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite:///./nft_game.db"
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
 
     # Admin
     admin_api_key: str = "change-this-key"
@@ -70,9 +74,9 @@ class Settings(BaseSettings):
     react_app_api_url: str = "http://localhost:8000/api"
     react_app_ipfs_gateway: str = "https://gateway.pinata.cloud/ipfs"
 
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins from comma-separated string."""
+        """Parse CORS origins from comma-separated string (computed once)."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
 
     class Config:
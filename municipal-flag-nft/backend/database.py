@@ -2,28 +2,98 @@
 Database connection and session management.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 
+# Async driver for each backend, whatever sync driver the URL names
+# (asyncpg must be installed when using PostgreSQL)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
 # Create engine based on database URL from .env
 # For SQLite, we need check_same_thread=False for FastAPI
 connect_args = {}
 if settings.database_url.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
+# Connection pool settings. Drop dead connections before use and recycle
+# old ones; the pool size only applies to server databases (SQLite
+# connections are local files, and aiosqlite doesn't pool at all).
+pool_args = {
+    "pool_pre_ping": True,
+    "pool_recycle": settings.db_pool_recycle,
+}
+if not settings.database_url.startswith("sqlite"):
+    pool_args.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout
+    )
+
+# Compiled SQL is cached per engine, keyed on statement structure. The
+# default 500 entries leaves little room once every router's queries and
+# their filter combinations are in; misses mean recompiling per request.
+QUERY_CACHE_SIZE = 1200
+
+# Rows per multi-row INSERT for bulk inserts (still capped by the driver's
+# bound-parameter limit). Applies to both engines.
+INSERTMANYVALUES_PAGE_SIZE = 10_000
+
+engine_args = {"insertmanyvalues_page_size": INSERTMANYVALUES_PAGE_SIZE}
+if make_url(settings.database_url).get_driver_name() == "psycopg2":
+    # Batch executemany UPDATEs/DELETEs too (INSERTs use insertmanyvalues)
+    engine_args["executemany_mode"] = "values_plus_batch"
+
 engine = create_engine(
     settings.database_url,
     connect_args=connect_args,
-    echo=settings.debug  # Log SQL queries in debug mode
+    echo=settings.debug,  # Log SQL queries in debug mode
+    query_cache_size=QUERY_CACHE_SIZE,
+    **engine_args,
+    **pool_args
 )
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def get_async_database_url(database_url: str) -> URL:
+    """
+    Swap the URL's driver for its backend's async one (e.g. sqlite or
+    sqlite+pysqlite -> sqlite+aiosqlite).
+
+    Returns the URL object itself: str(url) masks the password as ***.
+    """
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+# Async engine for the async endpoints (same database as `engine`)
+async_engine = create_async_engine(
+    get_async_database_url(settings.database_url),
+    echo=settings.debug,
+    query_cache_size=QUERY_CACHE_SIZE,
+    insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
+    **pool_args
+)
+
+# Async session factory. Objects stay usable after commit, since async
+# sessions can't lazily reload expired attributes.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
+# Set once the tables have been created for this process
+_initialized = False
+
 
 def get_db():
     """
@@ -37,15 +107,41 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Dependency that provides an async database session.
+    Use with FastAPI's Depends() in `async def` endpoints.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """
     Initialize the database by creating all tables.
     Import all models before calling this.
+
+    Safe to call repeatedly; only the first call per process touches
+    the database.
     """
+    global _initialized
+    if _initialized:
+        return
+
     from models import (
         Country, Region, Municipality, Flag,
         User, FlagInterest, FlagOwnership,
         UserConnection, Auction, Bid
     )
     Base.metadata.create_all(bind=engine)
+
+    # create_all skips existing tables, so add any indexes that were
+    # introduced after the database was created. Failures propagate and
+    # stop startup: some indexes enforce rules the app relies on (e.g.
+    # uq_active_auction_per_flag, which existing duplicates would block).
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    _initialized = True
     print("Database tables created successfully!")
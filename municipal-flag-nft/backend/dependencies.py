@@ -0,0 +1,22 @@
+"""
+Shared FastAPI dependencies.
+"""
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, status
+
+from config import settings
+
+# Encoded once; compared in constant time so response timing doesn't
+# leak how much of a guessed key was right
+_ADMIN_KEY = settings.admin_api_key.encode()
+
+
+def verify_admin(x_admin_key: Optional[str] = Header(None)):
+    """Verify admin API key for protected endpoints."""
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), _ADMIN_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or missing admin API key"
+        )
+    return True
@@ -4,11 +4,14 @@ Municipal Flag NFT Game - Backend API
 Main FastAPI application entry point.
 """
 # Updated to support IPFS import endpoints
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from config import settings
-from database import init_db
+from database import async_engine, init_db
 from routers import (
     countries_router,
     regions_router,
@@ -20,13 +23,32 @@ from routers import (
     admin_router
 )
 
+
+# =============================================================================
+# LIFESPAN
+# =============================================================================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database on startup; close async connections on shutdown."""
+    init_db()
+    print(f"🚀 {settings.project_name} API started!")
+    print(f"📝 Environment: {settings.environment}")
+    print(f"📚 API Docs: http://{settings.backend_host}:{settings.backend_port}/docs")
+    yield
+    await async_engine.dispose()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.project_name,
     description="A web game based on NFTs where players collect flags of real municipalities.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    # orjson encodes responses much faster than the stdlib json module
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -40,27 +62,37 @@ app.add_middleware(
 
 
 # =============================================================================
-# STARTUP EVENTS
+# ROUTES
 # =============================================================================
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup."""
-    init_db()
-    print(f"🚀 {settings.project_name} API started!")
-    print(f"📝 Environment: {settings.environment}")
-    print(f"📚 API Docs: http://{settings.backend_host}:{settings.backend_port}/docs")
-
+# The health and root payloads only depend on settings, so they're encoded
+# once here and served as-is (settings are read once per process anyway)
+HEALTH_BYTES = orjson.dumps({"status": "ok", "project": settings.project_name})
+
+ROOT_BYTES = orjson.dumps({
+    "name": settings.project_name,
+    "version": "1.0.0",
+    "description": "Municipal Flag NFT Game API",
+    "docs": "/docs",
+    "health": "/health",
+    "endpoints": {
+        "countries": "/api/countries",
+        "regions": "/api/regions",
+        "municipalities": "/api/municipalities",
+        "flags": "/api/flags",
+        "users": "/api/users",
+        "auctions": "/api/auctions",
+        "rankings": "/api/rankings",
+        "admin": "/api/admin"
+    }
+})
 
-# =============================================================================
-# ROUTES
-# =============================================================================
 
 # Health check
 @app.get("/health", tags=["Health"])
-def health_check():
+async def health_check():
     """Health check endpoint."""
-    return {"status": "ok", "project": settings.project_name}
+    return Response(HEALTH_BYTES, media_type="application/json")
 
 
 # API routers
@@ -79,25 +111,9 @@ app.include_router(admin_router, prefix="/api/admin")
 # =============================================================================
 
 @app.get("/", tags=["Root"])
-def root():
+async def root():
     """Root endpoint with API information."""
-    return {
-        "name": settings.project_name,
-        "version": "1.0.0",
-        "description": "Municipal Flag NFT Game API",
-        "docs": "/docs",
-        "health": "/health",
-        "endpoints": {
-            "countries": "/api/countries",
-            "regions": "/api/regions",
-            "municipalities": "/api/municipalities",
-            "flags": "/api/flags",
-            "users": "/api/users",
-            "auctions": "/api/auctions",
-            "rankings": "/api/rankings",
-            "admin": "/api/admin"
-        }
-    }
+    return Response(ROOT_BYTES, media_type="application/json")
 
 
 # =============================================================================
@@ -5,9 +5,9 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, DateTime,
-    ForeignKey, Enum, Text, UniqueConstraint, Numeric
+    ForeignKey, Enum, Text, UniqueConstraint, Index, Numeric, func, select, text
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from database import Base
 
 
@@ -100,6 +100,12 @@ class Municipality(Base):
     region = relationship("Region", back_populates="municipalities")
     flags = relationship("Flag", back_populates="municipality", cascade="all, delete-orphan")
 
+    # Indexes for the hot lookups
+    __table_args__ = (
+        # Municipality list: filter by region and visibility, ordered by name
+        Index("ix_municipalities_region_visible_name", "region_id", "is_visible", "name"),
+    )
+
     @property
     def coordinates(self) -> str:
         """Return formatted coordinates."""
@@ -149,6 +155,18 @@ class Flag(Base):
     ownerships = relationship("FlagOwnership", back_populates="flag", cascade="all, delete-orphan")
     auctions = relationship("Auction", back_populates="flag", cascade="all, delete-orphan")
 
+    # Indexes for the hot lookups
+    __table_args__ = (
+        # A municipality's flags (Municipality.flag_count counts through it)
+        Index("ix_flags_municipality", "municipality_id"),
+        # A municipality's flags still in the game (pair not complete)
+        Index(
+            "ix_flags_active_municipality", "municipality_id",
+            postgresql_where=is_pair_complete == False,
+            sqlite_where=is_pair_complete == False
+        ),
+    )
+
     def __repr__(self):
         return f"<Flag(id={self.id}, name='{self.name}', category={self.category.value})>"
 
@@ -218,6 +236,8 @@ class FlagInterest(Base):
     # Unique constraint - user can only express interest once per flag
     __table_args__ = (
         UniqueConstraint("user_id", "flag_id", name="unique_user_flag_interest"),
+        # Interest counts per flag
+        Index("ix_flag_interests_flag", "flag_id"),
     )
 
     def __repr__(self):
@@ -239,6 +259,14 @@ class FlagOwnership(Base):
     user = relationship("User", back_populates="ownerships")
     flag = relationship("Flag", back_populates="ownerships")
 
+    # Indexes for the hot lookups
+    __table_args__ = (
+        # Ownership check when creating an auction
+        Index("ix_ownership_flag_user", "flag_id", "user_id"),
+        # Flags-owned counts per user
+        Index("ix_ownership_user", "user_id"),
+    )
+
     def __repr__(self):
         return f"<FlagOwnership(user_id={self.user_id}, flag_id={self.flag_id}, type={self.ownership_type.value})>"
 
@@ -259,6 +287,8 @@ class UserConnection(Base):
     # Unique constraint - can only follow once
     __table_args__ = (
         UniqueConstraint("follower_id", "following_id", name="unique_follow"),
+        # Follower counts (the unique constraint covers follower_id lookups)
+        Index("ix_user_connections_following", "following_id"),
     )
 
     def __repr__(self):
@@ -290,7 +320,27 @@ class Auction(Base):
     flag = relationship("Flag", back_populates="auctions")
     seller = relationship("User", foreign_keys=[seller_id], back_populates="auctions_created")
     highest_bidder = relationship("User", foreign_keys=[highest_bidder_id])
-    bids = relationship("Bid", back_populates="auction", cascade="all, delete-orphan")
+    bids = relationship(
+        "Bid",
+        back_populates="auction",
+        cascade="all, delete-orphan",
+        order_by="(Bid.created_at.desc(), Bid.id.desc())"  # Newest first
+    )
+
+    # Indexes for the hot lookups
+    __table_args__ = (
+        # Auction list: filter by status, ordered by end time
+        Index("ix_auctions_status_ends_at", "status", "ends_at"),
+        # Active auction per flag
+        Index("ix_auctions_flag_status", "flag_id", "status"),
+        # At most one active auction per flag, enforced by the database
+        Index(
+            "uq_active_auction_per_flag", "flag_id",
+            unique=True,
+            postgresql_where=text(f"status = '{AuctionStatus.ACTIVE.name}'"),
+            sqlite_where=text(f"status = '{AuctionStatus.ACTIVE.name}'")
+        ),
+    )
 
     def __repr__(self):
         return f"<Auction(id={self.id}, flag_id={self.flag_id}, status={self.status.value})>"
@@ -310,5 +360,35 @@ class Bid(Base):
     auction = relationship("Auction", back_populates="bids")
     bidder = relationship("User", back_populates="bids")
 
+    # Indexes for the hot lookups
+    __table_args__ = (
+        # Bid history per auction, newest first
+        Index("ix_bids_auction_created", "auction_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Bid(auction_id={self.auction_id}, amount={self.amount})>"
+
+
+# =============================================================================
+# COUNT COLUMNS
+# =============================================================================
+# Sizes of child collections as correlated COUNT subqueries, so responses
+# can read a count without loading the collection. Deferred: they're only
+# computed when a query asks for them with undefer_group("counts").
+
+def _count_column(child_column, parent_id):
+    return column_property(
+        select(func.count()).where(child_column == parent_id).scalar_subquery(),
+        deferred=True,
+        group="counts"
+    )
+
+
+Region.municipality_count = _count_column(Municipality.region_id, Region.id)
+Municipality.flag_count = _count_column(Flag.municipality_id, Municipality.id)
+Flag.interest_count = _count_column(FlagInterest.flag_id, Flag.id)
+User.flags_owned = _count_column(FlagOwnership.user_id, User.id)
+User.followers_count = _count_column(UserConnection.following_id, User.id)
+User.following_count = _count_column(UserConnection.follower_id, User.id)
+Auction.bid_count = _count_column(Bid.auction_id, Auction.id)
@@ -1,134 +1,165 @@
 """
 Admin API Router.
 """
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-
-from database import get_db
+import threading
+import time
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, exists, func, select, text, true
+
+from database import get_async_db
+from dependencies import verify_admin
 from models import (
     Country, Region, Municipality, Flag, User,
-    FlagInterest, FlagOwnership, Auction, AuctionStatus
+    FlagInterest, FlagOwnership, Auction, AuctionStatus, Bid, UserConnection
 )
 from schemas import AdminStatsResponse, MessageResponse
 from config import settings
+from .municipalities import clear_municipality_cache
 
 router = APIRouter(tags=["Admin"])
 
+# /stats is polled by the admin dashboard; slightly stale counts are fine
+STATS_CACHE_TTL = 15  # seconds
+_stats_cache: dict = {}
+_stats_lock = threading.Lock()
 
-def verify_admin(x_admin_key: Optional[str] = Header(None)):
-    """Verify admin API key for protected endpoints."""
-    if x_admin_key != settings.admin_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid or missing admin API key"
-        )
-    return True
+
+def clear_stats_cache():
+    """Drop cached stats (call after bulk changes like seed/reset)."""
+    with _stats_lock:
+        _stats_cache.clear()
 
 
 @router.get("/stats", response_model=AdminStatsResponse)
-def get_admin_stats(
-    db: Session = Depends(get_db),
+async def get_admin_stats(
+    refresh: bool = Query(default=False, description="Bypass the stats cache"),
+    db: AsyncSession = Depends(get_async_db),
     _: bool = Depends(verify_admin)
 ):
-    """Get overall statistics for the admin panel."""
-    total_countries = db.query(func.count(Country.id)).scalar()
-    total_regions = db.query(func.count(Region.id)).scalar()
-    total_municipalities = db.query(func.count(Municipality.id)).scalar()
-    total_flags = db.query(func.count(Flag.id)).scalar()
-    total_users = db.query(func.count(User.id)).scalar()
-    total_interests = db.query(func.count(FlagInterest.id)).scalar()
-    total_ownerships = db.query(func.count(FlagOwnership.id)).scalar()
-    total_auctions = db.query(func.count(Auction.id)).scalar()
-    active_auctions = db.query(func.count(Auction.id)).filter(
-        Auction.status == AuctionStatus.ACTIVE
-    ).scalar()
-    completed_pairs = db.query(func.count(Flag.id)).filter(
-        Flag.is_pair_complete == True
-    ).scalar()
-
-    return AdminStatsResponse(
-        total_countries=total_countries or 0,
-        total_regions=total_regions or 0,
-        total_municipalities=total_municipalities or 0,
-        total_flags=total_flags or 0,
-        total_users=total_users or 0,
-        total_interests=total_interests or 0,
-        total_ownerships=total_ownerships or 0,
-        total_auctions=total_auctions or 0,
-        active_auctions=active_auctions or 0,
-        completed_pairs=completed_pairs or 0
-    )
+    """Get overall statistics for the admin panel (cached for a few seconds)."""
+    with _stats_lock:
+        cached = _stats_cache.get("stats")
+        if cached and not refresh and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+            return cached[1]
+
+    def count(column):
+        return select(func.count(column)).scalar_subquery()
+
+    # Flags and auctions are counted twice (all rows / filtered), so take
+    # both counts from one scan with conditional aggregates (FILTER)
+    flag_counts = select(
+        func.count(Flag.id).label("total_flags"),
+        func.count(Flag.id).filter(Flag.is_pair_complete == True).label("completed_pairs")
+    ).subquery()
+    auction_counts = select(
+        func.count(Auction.id).label("total_auctions"),
+        func.count(Auction.id).filter(Auction.status == AuctionStatus.ACTIVE).label("active_auctions")
+    ).subquery()
+
+    # All ten counts in one SELECT - a single round-trip. The database
+    # evaluates them together, so splitting them into concurrent queries
+    # would only add round-trips; and asyncio.gather can't overlap them on
+    # one AsyncSession anyway (it runs one statement at a time), so it would
+    # take a session and connection per count. The two aggregate
+    # subqueries are one row each, joined ON TRUE so that pairing them is
+    # explicit (not an implicit cross join).
+    row = (await db.execute(select(
+        count(Country.id).label("total_countries"),
+        count(Region.id).label("total_regions"),
+        count(Municipality.id).label("total_municipalities"),
+        count(User.id).label("total_users"),
+        count(FlagInterest.id).label("total_interests"),
+        count(FlagOwnership.id).label("total_ownerships"),
+        flag_counts,
+        auction_counts
+    ).select_from(flag_counts.join(auction_counts, true())))).one()
+
+    stats = AdminStatsResponse(**row._mapping)
+    with _stats_lock:
+        _stats_cache["stats"] = (time.monotonic(), stats)
+
+    return stats
 
 
 @router.post("/seed", response_model=MessageResponse)
-def seed_demo_data(
-    db: Session = Depends(get_db),
+async def seed_demo_data(
+    db: AsyncSession = Depends(get_async_db),
     _: bool = Depends(verify_admin)
 ):
     """Seed the database with demo data (only if empty)."""
-    # Check if data already exists
-    existing_countries = db.query(Country).count()
-    if existing_countries > 0:
+    # Check if data already exists (EXISTS stops at the first row)
+    if await db.scalar(select(exists().select_from(Country))):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Database already has data. Cannot seed."
         )
 
-    # Import seed function
+    # Import seed function (sync code, run on the session's sync facade)
     from seed_data import seed_database
-    seed_database(db)
+    await db.run_sync(seed_database)
+    await db.commit()
+    clear_stats_cache()
+    clear_municipality_cache()
 
     return MessageResponse(message="Demo data seeded successfully")
 
 
 @router.post("/reset", response_model=MessageResponse)
-def reset_database(
-    db: Session = Depends(get_db),
+async def reset_database(
+    db: AsyncSession = Depends(get_async_db),
     _: bool = Depends(verify_admin)
 ):
     """Reset the database (delete all data). USE WITH CAUTION."""
-    # Delete in correct order to respect foreign keys
-    db.query(FlagInterest).delete()
-    db.query(FlagOwnership).delete()
-    from models import Bid, UserConnection
-    db.query(Bid).delete()
-    db.query(Auction).delete()
-    db.query(UserConnection).delete()
-    db.query(User).delete()
-    db.query(Flag).delete()
-    db.query(Municipality).delete()
-    db.query(Region).delete()
-    db.query(Country).delete()
-    db.commit()
+    # Children before parents, so foreign keys hold on the DELETE path
+    models = (
+        FlagInterest, FlagOwnership, Bid, Auction, UserConnection,
+        User, Flag, Municipality, Region, Country
+    )
+
+    if db.bind.dialect.name == "postgresql":
+        # One statement that drops the data without scanning it, and
+        # restarts the id sequences
+        tables = ", ".join(model.__tablename__ for model in models)
+        await db.execute(text(f"TRUNCATE TABLE {tables} RESTART IDENTITY CASCADE"))
+    else:
+        for model in models:
+            await db.execute(delete(model))
+    await db.commit()
+    clear_stats_cache()
+    clear_municipality_cache()
 
     return MessageResponse(message="Database reset successfully")
 
 
+# Static for the life of the process, so encoded once (see main.py)
+HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "project": settings.project_name,
+    "environment": settings.environment
+})
+
+
 @router.get("/health")
-def health_check():
+async def health_check():
     """Simple health check endpoint."""
-    return {
-        "status": "healthy",
-        "project": settings.project_name,
-        "environment": settings.environment
-    }
+    return Response(HEALTH_BYTES, media_type="application/json")
 
 
 @router.get("/ipfs-status")
-def ipfs_status(
-    db: Session = Depends(get_db),
+async def ipfs_status(
+    db: AsyncSession = Depends(get_async_db),
     _: bool = Depends(verify_admin)
 ):
     """Get IPFS upload status for all flags."""
-    total_flags = db.query(func.count(Flag.id)).scalar() or 0
-    flags_with_image = db.query(func.count(Flag.id)).filter(
+    total_flags = await db.scalar(select(func.count(Flag.id))) or 0
+    flags_with_image = await db.scalar(select(func.count(Flag.id)).where(
         Flag.image_ipfs_hash.isnot(None)
-    ).scalar() or 0
-    flags_with_metadata = db.query(func.count(Flag.id)).filter(
+    )) or 0
+    flags_with_metadata = await db.scalar(select(func.count(Flag.id)).where(
         Flag.metadata_ipfs_hash.isnot(None)
-    ).scalar() or 0
+    )) or 0
 
     return {
         "total_flags": total_flags,
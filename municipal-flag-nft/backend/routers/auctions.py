@@ -5,155 +5,230 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from database import get_db
-from models import Auction, Bid, Flag, User, FlagOwnership, AuctionStatus, OwnershipType
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer_group
+from sqlalchemy import bindparam, func, lambda_stmt, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from database import get_async_db
+from models import (
+    Auction, Bid, Flag, User, FlagOwnership, AuctionStatus, OwnershipType
+)
 from schemas import (
     AuctionCreate, AuctionResponse, AuctionDetailResponse,
-    BidCreate, BidResponse, FlagResponse, UserResponse, MessageResponse
+    BidCreate, BidResponse, MessageResponse
 )
 
 router = APIRouter(tags=["Auctions"])
 
+# Loader options for everything an AuctionResponse reads, including the
+# deferred count columns (see COUNT COLUMNS in models.py). The responses
+# are validated straight from the ORM objects, so nothing may lazy load.
+AUCTION_OPTIONS = (
+    undefer_group("counts"),
+    selectinload(Auction.flag).undefer_group("counts"),
+    selectinload(Auction.seller).undefer_group("counts"),
+)
+
+# ...plus the bid history and highest bidder for AuctionDetailResponse
+AUCTION_DETAIL_OPTIONS = AUCTION_OPTIONS + (
+    selectinload(Auction.highest_bidder).undefer_group("counts"),
+    selectinload(Auction.bids).selectinload(Bid.bidder).undefer_group("counts"),
+)
+
+# Dialect-specific INSERTs that support ON CONFLICT (other dialects take
+# the savepoint path in get_or_create_user)
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Hot statements, built once. lambda_stmt caches the statement by the
+# lambda's code, so repeated calls skip both building the select() tree and
+# computing its cache key; values go in as bound parameters.
+GET_AUCTION = lambda_stmt(
+    lambda: select(Auction).options(*AUCTION_DETAIL_OPTIONS).where(
+        Auction.id == bindparam("auction_id")
+    ).execution_options(populate_existing=True)
+)
+
+GET_AUCTION_SUMMARY = lambda_stmt(
+    lambda: select(Auction).options(*AUCTION_OPTIONS).where(
+        Auction.id == bindparam("auction_id")
+    ).execution_options(populate_existing=True)
+)
+
+# Summary plus the highest bidder, whose reputation closing updates
+GET_AUCTION_FOR_CLOSE = lambda_stmt(
+    lambda: select(Auction).options(
+        *AUCTION_OPTIONS, selectinload(Auction.highest_bidder)
+    ).where(
+        Auction.id == bindparam("auction_id")
+    ).execution_options(populate_existing=True)
+)
+
+# Take the top spot with one conditional UPDATE. It only matches while the
+# auction is active, not ended, not the bidder's own and the bid beats the
+# current (or starting) price, so of two racing bids only one can win.
+TAKE_TOP_BID = lambda_stmt(
+    lambda: update(Auction).where(
+        Auction.id == bindparam("auction_id"),
+        Auction.status == AuctionStatus.ACTIVE,
+        Auction.ends_at >= bindparam("now"),
+        Auction.seller_id != bindparam("bidder_id"),
+        func.coalesce(Auction.current_highest_bid, Auction.starting_price) < bindparam("amount")
+    ).values(
+        current_highest_bid=bindparam("amount"),
+        highest_bidder_id=bindparam("bidder_id")
+    ).execution_options(synchronize_session=False)
+)
+
+GET_BID = lambda_stmt(
+    lambda: select(Bid).options(
+        selectinload(Bid.bidder).undefer_group("counts")
+    ).where(
+        Bid.id == bindparam("bid_id")
+    ).execution_options(populate_existing=True)
+)
+
 
-def get_or_create_user(db: Session, wallet_address: str) -> User:
-    """Get existing user or create new one."""
+async def get_or_create_user(db: AsyncSession, wallet_address: str) -> User:
+    """
+    Get existing user or create new one.
+
+    Known wallets (every bid after a user's first) are a single SELECT that
+    writes nothing. New wallets are inserted with ON CONFLICT DO NOTHING, so
+    concurrent requests for the same new wallet can't race on the unique
+    constraint: the one that loses reads the winner's row. Dialects without
+    ON CONFLICT insert inside a savepoint and re-read on IntegrityError.
+    """
     wallet = wallet_address.lower()
-    user = db.query(User).filter(User.wallet_address == wallet).first()
-    if not user:
-        user = User(wallet_address=wallet)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+    user = await db.scalar(select(User).where(User.wallet_address == wallet))
+    if user:
+        return user
+
+    upsert_insert = UPSERT_INSERTS.get(db.bind.dialect.name)
+    if upsert_insert is not None:
+        user = await db.scalar(
+            upsert_insert(User).values(wallet_address=wallet)
+            .on_conflict_do_nothing(index_elements=[User.wallet_address])
+            .returning(User),
+            execution_options={"populate_existing": True}
+        )
+    else:
+        try:
+            async with db.begin_nested():
+                user = User(wallet_address=wallet)
+                db.add(user)
+        except IntegrityError:
+            user = None
+
+    if user is None:
+        user = await db.scalar(select(User).where(User.wallet_address == wallet))
     return user
 
 
-def build_flag_response(flag: Flag) -> FlagResponse:
-    """Build flag response."""
-    return FlagResponse(
-        id=flag.id,
-        municipality_id=flag.municipality_id,
-        name=flag.name,
-        location_type=flag.location_type,
-        category=flag.category,
-        image_ipfs_hash=flag.image_ipfs_hash,
-        metadata_ipfs_hash=flag.metadata_ipfs_hash,
-        token_id=flag.token_id,
-        price=flag.price,
-        first_nft_status=flag.first_nft_status,
-        second_nft_status=flag.second_nft_status,
-        is_pair_complete=flag.is_pair_complete,
-        created_at=flag.created_at,
-        interest_count=len(flag.interests)
+async def get_auction_or_404(
+    db: AsyncSession, auction_id: int, stmt=GET_AUCTION
+) -> Auction:
+    """Get an auction with everything its response reads loaded, or raise 404."""
+    auction = await db.scalar(stmt, {"auction_id": auction_id})
+    if not auction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Auction with id {auction_id} not found"
+        )
+    return auction
+
+
+def is_active_auction_conflict(error: IntegrityError) -> bool:
+    """Whether an IntegrityError came from uq_active_auction_per_flag."""
+    # PostgreSQL names the violated index; SQLite only names its column
+    message = str(error.orig)
+    return (
+        "uq_active_auction_per_flag" in message
+        or "UNIQUE constraint failed: auctions.flag_id" in message
     )
 
 
-def build_user_response(user: User) -> UserResponse:
-    """Build user response."""
-    return UserResponse(
-        id=user.id,
-        wallet_address=user.wallet_address,
-        username=user.username,
-        reputation_score=user.reputation_score,
-        created_at=user.created_at,
-        flags_owned=len(user.ownerships),
-        followers_count=len(user.followers),
-        following_count=len(user.following)
+async def raise_bid_error(db: AsyncSession, auction_id: int, bidder: User, now: datetime):
+    """Raise the reason a bid was rejected (called after the bid UPDATE matched nothing)."""
+    auction = await db.get(Auction, auction_id)
+    if not auction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Auction with id {auction_id} not found"
+        )
+
+    # Check auction is active
+    if auction.status != AuctionStatus.ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Auction is not active"
+        )
+
+    # Check auction hasn't ended
+    if now > auction.ends_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Auction has ended"
+        )
+
+    # Can't bid on own auction
+    if bidder.id == auction.seller_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot bid on your own auction"
+        )
+
+    # Otherwise the bid wasn't higher than the current highest
+    min_bid = auction.current_highest_bid or auction.starting_price
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Bid must be higher than {min_bid}"
     )
 
 
 @router.get("", response_model=List[AuctionResponse])
-def get_auctions(
+async def get_auctions(
     active_only: bool = True,
     flag_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all auctions."""
-    query = db.query(Auction)
+    # Each filter is its own cached lambda; flag_id becomes a bound parameter
+    query = lambda_stmt(lambda: select(Auction).options(*AUCTION_OPTIONS))
 
     if active_only:
-        query = query.filter(Auction.status == AuctionStatus.ACTIVE)
+        query += lambda s: s.where(Auction.status == AuctionStatus.ACTIVE)
     if flag_id:
-        query = query.filter(Auction.flag_id == flag_id)
-
-    auctions = query.order_by(Auction.ends_at).all()
-
-    result = []
-    for auction in auctions:
-        result.append(AuctionResponse(
-            id=auction.id,
-            flag_id=auction.flag_id,
-            seller_id=auction.seller_id,
-            starting_price=auction.starting_price,
-            current_highest_bid=auction.current_highest_bid,
-            highest_bidder_id=auction.highest_bidder_id,
-            status=auction.status,
-            ends_at=auction.ends_at,
-            created_at=auction.created_at,
-            flag=build_flag_response(auction.flag),
-            seller=build_user_response(auction.seller),
-            bid_count=len(auction.bids)
-        ))
-
-    return result
+        query += lambda s: s.where(Auction.flag_id == flag_id)
+    query += lambda s: s.order_by(Auction.ends_at)
+
+    # Counts come from SQL and the response model reads the ORM objects
+    # directly (from_attributes), so no per-auction building is needed
+    return (await db.scalars(query)).all()
 
 
 @router.get("/{auction_id}", response_model=AuctionDetailResponse)
-def get_auction(
+async def get_auction(
     auction_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get auction details with bid history."""
-    auction = db.query(Auction).filter(Auction.id == auction_id).first()
-    if not auction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Auction with id {auction_id} not found"
-        )
-
-    # Build bids list
-    bids_data = []
-    for bid in sorted(auction.bids, key=lambda b: b.created_at, reverse=True):
-        bids_data.append(BidResponse(
-            id=bid.id,
-            auction_id=bid.auction_id,
-            bidder_id=bid.bidder_id,
-            amount=bid.amount,
-            created_at=bid.created_at,
-            bidder=build_user_response(bid.bidder)
-        ))
-
-    highest_bidder = None
-    if auction.highest_bidder:
-        highest_bidder = build_user_response(auction.highest_bidder)
-
-    return AuctionDetailResponse(
-        id=auction.id,
-        flag_id=auction.flag_id,
-        seller_id=auction.seller_id,
-        starting_price=auction.starting_price,
-        current_highest_bid=auction.current_highest_bid,
-        highest_bidder_id=auction.highest_bidder_id,
-        status=auction.status,
-        ends_at=auction.ends_at,
-        created_at=auction.created_at,
-        flag=build_flag_response(auction.flag),
-        seller=build_user_response(auction.seller),
-        bid_count=len(bids_data),
-        bids=bids_data,
-        highest_bidder=highest_bidder
-    )
+    # Bids come back newest first (Auction.bids is ordered in the model)
+    return await get_auction_or_404(db, auction_id)
 
 
 @router.post("", response_model=AuctionResponse, status_code=status.HTTP_201_CREATED)
-def create_auction(
+async def create_auction(
     auction_data: AuctionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new auction."""
     # Verify flag exists
-    flag = db.query(Flag).filter(Flag.id == auction_data.flag_id).first()
+    flag = await db.get(Flag, auction_data.flag_id)
     if not flag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -161,30 +236,19 @@ def create_auction(
         )
 
     # Get seller
-    seller = get_or_create_user(db, auction_data.wallet_address)
+    seller = await get_or_create_user(db, auction_data.wallet_address)
 
     # Verify seller owns the flag
-    ownership = db.query(FlagOwnership).filter(
+    ownership = await db.scalar(select(FlagOwnership).where(
         FlagOwnership.flag_id == auction_data.flag_id,
         FlagOwnership.user_id == seller.id
-    ).first()
+    ))
     if not ownership:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You must own this flag to create an auction"
         )
 
-    # Check if there's already an active auction for this flag
-    existing = db.query(Auction).filter(
-        Auction.flag_id == auction_data.flag_id,
-        Auction.status == AuctionStatus.ACTIVE
-    ).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="There is already an active auction for this flag"
-        )
-
     # Create auction
     ends_at = datetime.utcnow() + timedelta(hours=auction_data.duration_hours)
     auction = Auction(
@@ -194,70 +258,43 @@ def create_auction(
         ends_at=ends_at
     )
     db.add(auction)
-    db.commit()
-    db.refresh(auction)
-
-    return AuctionResponse(
-        id=auction.id,
-        flag_id=auction.flag_id,
-        seller_id=auction.seller_id,
-        starting_price=auction.starting_price,
-        current_highest_bid=auction.current_highest_bid,
-        highest_bidder_id=auction.highest_bidder_id,
-        status=auction.status,
-        ends_at=auction.ends_at,
-        created_at=auction.created_at,
-        flag=build_flag_response(flag),
-        seller=build_user_response(seller),
-        bid_count=0
-    )
+
+    # One active auction per flag is enforced by a partial unique index
+    # (uq_active_auction_per_flag), so concurrent creates can't both win
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if not is_active_auction_conflict(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="There is already an active auction for this flag"
+        )
+
+    return await get_auction_or_404(db, auction.id, GET_AUCTION_SUMMARY)
 
 
 @router.post("/{auction_id}/bid", response_model=BidResponse, status_code=status.HTTP_201_CREATED)
-def place_bid(
+async def place_bid(
     auction_id: int,
     bid_data: BidCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Place a bid on an auction."""
-    auction = db.query(Auction).filter(Auction.id == auction_id).first()
-    if not auction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Auction with id {auction_id} not found"
-        )
-
-    # Check auction is active
-    if auction.status != AuctionStatus.ACTIVE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Auction is not active"
-        )
-
-    # Check auction hasn't ended
-    if datetime.utcnow() > auction.ends_at:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Auction has ended"
-        )
-
     # Get bidder
-    bidder = get_or_create_user(db, bid_data.wallet_address)
-
-    # Can't bid on own auction
-    if bidder.id == auction.seller_id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot bid on your own auction"
-        )
-
-    # Check bid is higher than current highest
-    min_bid = auction.current_highest_bid or auction.starting_price
-    if bid_data.amount <= min_bid:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Bid must be higher than {min_bid}"
-        )
+    bidder = await get_or_create_user(db, bid_data.wallet_address)
+
+    # Take the top spot (see TAKE_TOP_BID)
+    now = datetime.utcnow()
+    result = await db.execute(TAKE_TOP_BID, {
+        "auction_id": auction_id,
+        "now": now,
+        "bidder_id": bidder.id,
+        "amount": bid_data.amount
+    })
+    if result.rowcount == 0:
+        await raise_bid_error(db, auction_id, bidder, now)
 
     # Create bid
     bid = Bid(
@@ -267,35 +304,18 @@ def place_bid(
     )
     db.add(bid)
 
-    # Update auction
-    auction.current_highest_bid = bid_data.amount
-    auction.highest_bidder_id = bidder.id
-
-    db.commit()
-    db.refresh(bid)
+    await db.commit()
 
-    return BidResponse(
-        id=bid.id,
-        auction_id=bid.auction_id,
-        bidder_id=bid.bidder_id,
-        amount=bid.amount,
-        created_at=bid.created_at,
-        bidder=build_user_response(bidder)
-    )
+    return await db.scalar(GET_BID, {"bid_id": bid.id})
 
 
 @router.post("/{auction_id}/close", response_model=AuctionResponse)
-def close_auction(
+async def close_auction(
     auction_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Close an auction (can be called by anyone after end time)."""
-    auction = db.query(Auction).filter(Auction.id == auction_id).first()
-    if not auction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Auction with id {auction_id} not found"
-        )
+    auction = await get_auction_or_404(db, auction_id, GET_AUCTION_FOR_CLOSE)
 
     if auction.status != AuctionStatus.ACTIVE:
         raise HTTPException(
@@ -316,37 +336,24 @@ def close_auction(
     # If there was a winner, transfer ownership (off-chain record)
     if auction.highest_bidder_id:
         # Award reputation to winner
-        winner = db.query(User).filter(User.id == auction.highest_bidder_id).first()
+        winner = auction.highest_bidder
         if winner:
             winner.reputation_score += 15
 
-    db.commit()
-    db.refresh(auction)
-
-    return AuctionResponse(
-        id=auction.id,
-        flag_id=auction.flag_id,
-        seller_id=auction.seller_id,
-        starting_price=auction.starting_price,
-        current_highest_bid=auction.current_highest_bid,
-        highest_bidder_id=auction.highest_bidder_id,
-        status=auction.status,
-        ends_at=auction.ends_at,
-        created_at=auction.created_at,
-        flag=build_flag_response(auction.flag),
-        seller=build_user_response(auction.seller),
-        bid_count=len(auction.bids)
-    )
+    await db.commit()
+
+    # Flushing the update expires the count columns, so load them again
+    return await get_auction_or_404(db, auction_id, GET_AUCTION_SUMMARY)
 
 
 @router.post("/{auction_id}/cancel", response_model=MessageResponse)
-def cancel_auction(
+async def cancel_auction(
     auction_id: int,
     wallet_address: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel an auction (only seller can cancel if no bids)."""
-    auction = db.query(Auction).filter(Auction.id == auction_id).first()
+    auction = await db.get(Auction, auction_id)
     if not auction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -355,7 +362,7 @@ def cancel_auction(
 
     # Get user
     wallet = wallet_address.lower()
-    user = db.query(User).filter(User.wallet_address == wallet).first()
+    user = await db.scalar(select(User).where(User.wallet_address == wallet))
     if not user or user.id != auction.seller_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -376,6 +383,6 @@ def cancel_auction(
         )
 
     auction.status = AuctionStatus.CANCELLED
-    db.commit()
+    await db.commit()
 
     return MessageResponse(message="Auction cancelled successfully")
@@ -1,32 +1,22 @@
 """
 Countries API Router.
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from database import get_db
+from dependencies import verify_admin
 from models import Country, Region
 from schemas import (
     CountryCreate, CountryUpdate, CountryResponse,
     CountryDetailResponse, MessageResponse
 )
-from config import settings
 
 router = APIRouter(tags=["Countries"])
 
 
-def verify_admin(x_admin_key: Optional[str] = Header(None)):
-    """Verify admin API key for protected endpoints."""
-    if x_admin_key != settings.admin_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid or missing admin API key"
-        )
-    return True
-
-
 @router.get("", response_model=List[CountryResponse])
 def get_countries(
     visible_only: bool = True,
@@ -2,31 +2,21 @@
 Flags API Router.
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from database import get_db
+from dependencies import verify_admin
 from models import Flag, Municipality, User, FlagInterest, FlagOwnership, NFTStatus, OwnershipType
 from schemas import (
     FlagCreate, FlagUpdate, FlagResponse, FlagDetailResponse,
     FlagInterestCreate, FlagInterestResponse, FlagOwnershipCreate,
     FlagOwnershipResponse, MunicipalityResponse, UserResponse, MessageResponse
 )
-from config import settings
 
 router = APIRouter(tags=["Flags"])
 
 
-def verify_admin(x_admin_key: Optional[str] = Header(None)):
-    """Verify admin API key for protected endpoints."""
-    if x_admin_key != settings.admin_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid or missing admin API key"
-        )
-    return True
-
-
 def get_or_create_user(db: Session, wallet_address: str) -> User:
     """Get existing user or create new one."""
     wallet = wallet_address.lower()
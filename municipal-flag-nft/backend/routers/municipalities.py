@@ -1,29 +1,253 @@
 """
 Municipalities API Router.
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
+import asyncio
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import bindparam, exists, insert, lambda_stmt, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, raiseload, selectinload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 
 from database import get_db
-from models import Municipality, Region, Flag
+from dependencies import verify_admin
+from models import Municipality, Region, Flag, Auction
 from schemas import (
     MunicipalityCreate, MunicipalityUpdate, MunicipalityResponse,
-    MunicipalityDetailResponse, RegionResponse, FlagResponse, MessageResponse
+    MunicipalityDetailResponse, MessageResponse
 )
-from config import settings
 
-router = APIRouter(tags=["Municipalities"])
 
+class ModelResponseRoute(APIRoute):
+    """
+    Route that encodes a returned response model itself.
 
-def verify_admin(x_admin_key: Optional[str] = Header(None)):
-    """Verify admin API key for protected endpoints."""
-    if x_admin_key != settings.admin_api_key:
+    When an endpoint returns an instance of exactly its response_model, the
+    model was validated as it was built, so it's dumped to JSON directly
+    instead of going through jsonable_encoder and revalidation. Anything
+    else (dicts, Responses, other models) takes FastAPI's usual path.
+    Headers set on an injected `response: Response` don't apply to the
+    fast path, so don't combine the two.
+    """
+
+    def get_route_handler(self):
+        model = self.response_model
+        filtered = (
+            self.response_model_include or self.response_model_exclude
+            or self.response_model_exclude_unset or self.response_model_exclude_defaults
+            or self.response_model_exclude_none
+        )
+        if not (isinstance(model, type) and issubclass(model, BaseModel)) or filtered:
+            return super().get_route_handler()
+
+        call = self.dependant.call
+        status_code = self.status_code or status.HTTP_200_OK
+
+        def encode(result):
+            if type(result) is model:
+                return Response(
+                    result.model_dump_json(), status_code=status_code,
+                    media_type="application/json"
+                )
+            return result
+
+        if asyncio.iscoroutinefunction(call):
+            async def endpoint(**kwargs):
+                return encode(await call(**kwargs))
+        else:
+            def endpoint(**kwargs):
+                return encode(call(**kwargs))
+
+        # The request handler calls dependant.call, so hand it a copy that
+        # calls the wrapper instead
+        original = self.dependant
+        self.dependant = copy.copy(original)
+        self.dependant.call = endpoint
+        try:
+            return super().get_route_handler()
+        finally:
+            self.dependant = original
+
+
+router = APIRouter(
+    tags=["Municipalities"],
+    default_response_class=ORJSONResponse,
+    route_class=ModelResponseRoute
+)
+
+# Geography changes rarely, so the GET responses are cached as encoded
+# JSON. Writes here clear the cache; flag changes elsewhere (counts,
+# completed pairs) show up once the short TTLs run out. Keys come from
+# client input, so the cache is an LRU capped at RESPONSE_CACHE_SIZE.
+LIST_CACHE_TTL = 15  # seconds
+DETAIL_CACHE_TTL = 5  # seconds
+RESPONSE_CACHE_SIZE = 1024
+_response_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_response_lock = threading.Lock()
+
+
+def clear_municipality_cache():
+    """Drop cached municipality responses (call after writes)."""
+    with _response_lock:
+        _response_cache.clear()
+
+
+def cached_response(
+    key: tuple, ttl: float, build: Callable[[], object],
+    keep: Optional[Callable[[object], bool]] = None
+) -> Response:
+    """
+    Serve `key` from the cache, or encode `build()` and cache it.
+
+    Expired entries are kept (until the LRU evicts them) so they can still
+    be served if the database fails while rebuilding them (stale-while-
+    error). Errors from `build` such as a 404 are raised as usual and not
+    cached, nor are results `keep` rejects.
+    """
+    with _response_lock:
+        entry = _response_cache.get(key)
+        if entry:
+            _response_cache.move_to_end(key)
+
+    now = time.monotonic()
+    if entry and now - entry[0] < ttl:
+        return Response(entry[1], media_type="application/json")
+
+    try:
+        result = build()
+    except SQLAlchemyError:
+        if not entry:
+            raise
+        return Response(entry[1], media_type="application/json")
+
+    body = orjson.dumps(result)
+    if keep is None or keep(result):
+        with _response_lock:
+            _response_cache[key] = (now, body)
+            _response_cache.move_to_end(key)
+            if len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+
+    return Response(body, media_type="application/json")
+
+
+# Serializer for the bulk create response, built once
+MUNICIPALITY_LIST_ADAPTER = TypeAdapter(List[MunicipalityResponse])
+
+# Which of a set of region ids exist (bulk create), built and cached once
+EXISTING_REGION_IDS = lambda_stmt(
+    lambda: select(Region.id).where(Region.id.in_(bindparam("ids", expanding=True)))
+)
+
+
+# The GET endpoints build plain dicts and encode them with orjson, skipping
+# FastAPI's jsonable_encoder and response-model revalidation (the
+# response_model is still declared, for the docs). The dicts must render
+# exactly as the Pydantic models would: orjson handles datetimes and enums
+# natively, and Decimals are emitted as strings like Pydantic does.
+
+def municipality_row(municipality: Municipality, flag_count: int) -> dict:
+    """Plain-dict MunicipalityResponse."""
+    return {
+        "id": municipality.id,
+        "name": municipality.name,
+        "region_id": municipality.region_id,
+        "latitude": municipality.latitude,
+        "longitude": municipality.longitude,
+        "coordinates": municipality.coordinates,
+        "is_visible": municipality.is_visible,
+        "created_at": municipality.created_at,
+        "flag_count": flag_count
+    }
+
+
+def flag_row(flag: Flag, interest_count: int) -> dict:
+    """Plain-dict FlagResponse."""
+    return {
+        "id": flag.id,
+        "municipality_id": flag.municipality_id,
+        "name": flag.name,
+        "location_type": flag.location_type,
+        "category": flag.category,
+        "image_ipfs_hash": flag.image_ipfs_hash,
+        "metadata_ipfs_hash": flag.metadata_ipfs_hash,
+        "token_id": flag.token_id,
+        "price": str(flag.price),
+        "first_nft_status": flag.first_nft_status,
+        "second_nft_status": flag.second_nft_status,
+        "is_pair_complete": flag.is_pair_complete,
+        "created_at": flag.created_at,
+        "interest_count": interest_count
+    }
+
+
+def municipality_list_query(db: Session, region_id: Optional[int], visible_only: bool):
+    """Query for the municipality list, ordered by name."""
+    # flag_count comes back as a column (see COUNT COLUMNS in models.py),
+    # so no flags collection is loaded per municipality
+    query = db.query(Municipality).options(undefer(Municipality.flag_count))
+
+    if region_id:
+        query = query.filter(Municipality.region_id == region_id)
+    if visible_only:
+        query = query.filter(Municipality.is_visible == True)
+
+    return query.order_by(Municipality.name)
+
+
+def list_municipalities(db: Session, region_id: Optional[int], visible_only: bool) -> list:
+    """Build the municipality list response."""
+    return [
+        municipality_row(municipality, municipality.flag_count)
+        for municipality in municipality_list_query(db, region_id, visible_only)
+    ]
+
+
+def municipality_detail(db: Session, municipality_id: int) -> dict:
+    """Build the municipality detail response, or raise 404."""
+    # Region and flags in one selectin each, with their counts as columns.
+    # Flags whose pair is complete are "removed from game", so the load
+    # skips them. raiseload turns any lazy load that slips in into an error.
+    municipality = db.get(Municipality, municipality_id, options=[
+        selectinload(Municipality.region).undefer(Region.municipality_count),
+        selectinload(
+            Municipality.flags.and_(Flag.is_pair_complete == False)
+        ).undefer_group("counts"),
+        raiseload("*")
+    ])
+    if not municipality:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid or missing admin API key"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Municipality with id {municipality_id} not found"
         )
-    return True
+
+    # Build region response
+    region = municipality.region
+    region_data = {
+        "id": region.id,
+        "name": region.name,
+        "country_id": region.country_id,
+        "is_visible": region.is_visible,
+        "created_at": region.created_at,
+        "municipality_count": region.municipality_count
+    }
+
+    # Build flags list
+    flags_data = [flag_row(flag, flag.interest_count) for flag in municipality.flags]
+
+    result = municipality_row(municipality, len(flags_data))
+    result["region"] = region_data
+    result["flags"] = flags_data
+
+    return result
 
 
 @router.get("", response_model=List[MunicipalityResponse])
@@ -33,30 +257,41 @@ def get_municipalities(
     db: Session = Depends(get_db)
 ):
     """Get all municipalities, optionally filtered by region."""
-    query = db.query(Municipality)
+    # An empty list for a region that doesn't exist isn't cached, so
+    # made-up region ids can't fill the cache
+    return cached_response(
+        ("list", region_id, visible_only), LIST_CACHE_TTL,
+        lambda: list_municipalities(db, region_id, visible_only),
+        keep=lambda rows: bool(rows) or not region_id or db.get(Region, region_id) is not None
+    )
 
-    if region_id:
-        query = query.filter(Municipality.region_id == region_id)
-    if visible_only:
-        query = query.filter(Municipality.is_visible == True)
 
-    municipalities = query.order_by(Municipality.name).all()
-
-    result = []
-    for municipality in municipalities:
-        result.append(MunicipalityResponse(
-            id=municipality.id,
-            name=municipality.name,
-            region_id=municipality.region_id,
-            latitude=municipality.latitude,
-            longitude=municipality.longitude,
-            coordinates=municipality.coordinates,
-            is_visible=municipality.is_visible,
-            created_at=municipality.created_at,
-            flag_count=len(municipality.flags)
-        ))
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {
+        "description": "One MunicipalityResponse JSON object per line",
+        "content": {"application/x-ndjson": {}}
+    }}
+)
+def stream_municipalities(
+    region_id: Optional[int] = None,
+    visible_only: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Same as the list, streamed as NDJSON (one municipality per line).
 
-    return result
+    Rows are fetched in batches and encoded as they arrive, so large
+    regions start sending at once and never sit in memory as a whole.
+    """
+    query = municipality_list_query(db, region_id, visible_only).yield_per(500)
+
+    def lines():
+        for municipality in query:
+            yield orjson.dumps(municipality_row(municipality, municipality.flag_count)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get("/{municipality_id}", response_model=MunicipalityDetailResponse)
@@ -65,59 +300,9 @@ def get_municipality(
     db: Session = Depends(get_db)
 ):
     """Get a single municipality with its flags."""
-    municipality = db.query(Municipality).filter(Municipality.id == municipality_id).first()
-    if not municipality:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Municipality with id {municipality_id} not found"
-        )
-
-    # Build region response
-    region_data = RegionResponse(
-        id=municipality.region.id,
-        name=municipality.region.name,
-        country_id=municipality.region.country_id,
-        is_visible=municipality.region.is_visible,
-        created_at=municipality.region.created_at,
-        municipality_count=len(municipality.region.municipalities)
-    )
-
-    # Build flags list (filter out completed pairs - they're "removed from game")
-    flags_data = []
-    for flag in municipality.flags:
-        # Skip flags where the pair is complete (removed from game)
-        if flag.is_pair_complete:
-            continue
-
-        flags_data.append(FlagResponse(
-            id=flag.id,
-            municipality_id=flag.municipality_id,
-            name=flag.name,
-            location_type=flag.location_type,
-            category=flag.category,
-            image_ipfs_hash=flag.image_ipfs_hash,
-            metadata_ipfs_hash=flag.metadata_ipfs_hash,
-            token_id=flag.token_id,
-            price=flag.price,
-            first_nft_status=flag.first_nft_status,
-            second_nft_status=flag.second_nft_status,
-            is_pair_complete=flag.is_pair_complete,
-            created_at=flag.created_at,
-            interest_count=len(flag.interests)
-        ))
-
-    return MunicipalityDetailResponse(
-        id=municipality.id,
-        name=municipality.name,
-        region_id=municipality.region_id,
-        latitude=municipality.latitude,
-        longitude=municipality.longitude,
-        coordinates=municipality.coordinates,
-        is_visible=municipality.is_visible,
-        created_at=municipality.created_at,
-        flag_count=len(flags_data),
-        region=region_data,
-        flags=flags_data
+    return cached_response(
+        ("detail", municipality_id), DETAIL_CACHE_TTL,
+        lambda: municipality_detail(db, municipality_id)
     )
 
 
@@ -129,35 +314,69 @@ def create_municipality(
 ):
     """Create a new municipality (admin only)."""
     # Verify region exists
-    region = db.query(Region).filter(Region.id == municipality.region_id).first()
+    region = db.get(Region, municipality.region_id)
     if not region:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Region with id {municipality.region_id} not found"
         )
 
-    db_municipality = Municipality(
-        name=municipality.name,
-        region_id=municipality.region_id,
-        latitude=municipality.latitude,
-        longitude=municipality.longitude,
-        is_visible=municipality.is_visible
+    # INSERT ... RETURNING hands back the new row, so there's no refresh
+    # round-trip. Build the response before commit expires it.
+    db_municipality = db.scalar(
+        insert(Municipality).values(**municipality.model_dump()).returning(Municipality)
     )
-    db.add(db_municipality)
+    # A new municipality has no flags: fill in the count instead of
+    # letting validation load it
+    set_committed_value(db_municipality, "flag_count", 0)
+    response = MunicipalityResponse.model_validate(db_municipality)
     db.commit()
-    db.refresh(db_municipality)
-
-    return MunicipalityResponse(
-        id=db_municipality.id,
-        name=db_municipality.name,
-        region_id=db_municipality.region_id,
-        latitude=db_municipality.latitude,
-        longitude=db_municipality.longitude,
-        coordinates=db_municipality.coordinates,
-        is_visible=db_municipality.is_visible,
-        created_at=db_municipality.created_at,
-        flag_count=0
+    clear_municipality_cache()
+
+    return response
+
+
+@router.post("/bulk", response_model=List[MunicipalityResponse], status_code=status.HTTP_201_CREATED)
+def create_municipalities_bulk(
+    municipalities: List[MunicipalityCreate],
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_admin)
+):
+    """Create many municipalities in one transaction (admin only)."""
+    if not municipalities:
+        return []
+
+    # Verify all regions exist with one query
+    region_ids = {municipality.region_id for municipality in municipalities}
+    found = set(db.scalars(EXISTING_REGION_IDS, {"ids": list(region_ids)}))
+    missing = sorted(region_ids - found)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Regions not found: {', '.join(map(str, missing))}"
+        )
+
+    # One executemany; SQLAlchemy batches it into multi-row
+    # INSERT ... RETURNING statements (insertmanyvalues). Not
+    # sort_by_parameter_order: backends without an insert sentinel (SQLite)
+    # fall back to one INSERT per row for it. Ids are handed out in
+    # insert order, so sorting by id restores the request order.
+    created = sorted(db.scalars(
+        insert(Municipality).returning(Municipality),
+        [municipality.model_dump() for municipality in municipalities]
+    ).all(), key=lambda db_municipality: db_municipality.id)
+    for db_municipality in created:
+        set_committed_value(db_municipality, "flag_count", 0)
+
+    # Validate and encode straight from the ORM rows, skipping FastAPI's
+    # jsonable_encoder and revalidation
+    body = MUNICIPALITY_LIST_ADAPTER.dump_json(
+        MUNICIPALITY_LIST_ADAPTER.validate_python(created, from_attributes=True)
     )
+    db.commit()
+    clear_municipality_cache()
+
+    return Response(body, status_code=status.HTTP_201_CREATED, media_type="application/json")
 
 
 @router.put("/{municipality_id}", response_model=MunicipalityResponse)
@@ -168,45 +387,47 @@ def update_municipality(
     _: bool = Depends(verify_admin)
 ):
     """Update a municipality (admin only)."""
-    db_municipality = db.query(Municipality).filter(Municipality.id == municipality_id).first()
-    if not db_municipality:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Municipality with id {municipality_id} not found"
+    # Unset and null fields are left as they are
+    values = municipality.model_dump(exclude_none=True)
+
+    if not values:
+        db_municipality = db.get(
+            Municipality, municipality_id, options=[undefer(Municipality.flag_count)]
         )
+        if not db_municipality:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Municipality with id {municipality_id} not found"
+            )
+        return MunicipalityResponse.model_validate(db_municipality)
+
+    # One UPDATE ... RETURNING, which also checks that a new region exists.
+    # (SQLite doesn't enforce foreign keys here, so the check can't be
+    # left to the constraint.)
+    stmt = update(Municipality).where(Municipality.id == municipality_id)
+    if "region_id" in values:
+        stmt = stmt.where(exists().where(Region.id == values["region_id"]))
 
-    if municipality.name is not None:
-        db_municipality.name = municipality.name
-    if municipality.region_id is not None:
-        # Verify new region exists
-        region = db.query(Region).filter(Region.id == municipality.region_id).first()
-        if not region:
+    db_municipality = db.scalar(stmt.values(**values).returning(Municipality))
+    if not db_municipality:
+        # Nothing matched: work out which lookup failed
+        if not db.get(Municipality, municipality_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Region with id {municipality.region_id} not found"
+                detail=f"Municipality with id {municipality_id} not found"
             )
-        db_municipality.region_id = municipality.region_id
-    if municipality.latitude is not None:
-        db_municipality.latitude = municipality.latitude
-    if municipality.longitude is not None:
-        db_municipality.longitude = municipality.longitude
-    if municipality.is_visible is not None:
-        db_municipality.is_visible = municipality.is_visible
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Region with id {values['region_id']} not found"
+        )
 
+    # flag_count (deferred) loads on its own here: SQLite renders RETURNING
+    # columns unqualified, which breaks the correlated count subquery
+    response = MunicipalityResponse.model_validate(db_municipality)
     db.commit()
-    db.refresh(db_municipality)
-
-    return MunicipalityResponse(
-        id=db_municipality.id,
-        name=db_municipality.name,
-        region_id=db_municipality.region_id,
-        latitude=db_municipality.latitude,
-        longitude=db_municipality.longitude,
-        coordinates=db_municipality.coordinates,
-        is_visible=db_municipality.is_visible,
-        created_at=db_municipality.created_at,
-        flag_count=len(db_municipality.flags)
-    )
+    clear_municipality_cache()
+
+    return response
 
 
 @router.delete("/{municipality_id}", response_model=MessageResponse)
@@ -216,7 +437,14 @@ def delete_municipality(
     _: bool = Depends(verify_admin)
 ):
     """Delete a municipality (admin only)."""
-    db_municipality = db.query(Municipality).filter(Municipality.id == municipality_id).first()
+    # The delete cascades down to every flag's interests, ownerships and
+    # auctions; load them up front, one query per level instead of per flag
+    flags = selectinload(Municipality.flags)
+    db_municipality = db.get(Municipality, municipality_id, options=[
+        flags.selectinload(Flag.interests),
+        flags.selectinload(Flag.ownerships),
+        flags.selectinload(Flag.auctions).selectinload(Auction.bids)
+    ])
     if not db_municipality:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -225,5 +453,6 @@ def delete_municipality(
 
     db.delete(db_municipality)
     db.commit()
+    clear_municipality_cache()
 
     return MessageResponse(message=f"Municipality '{db_municipality.name}' deleted successfully")
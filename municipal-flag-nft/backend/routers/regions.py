@@ -2,30 +2,20 @@
 Regions API Router.
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from database import get_db
+from dependencies import verify_admin
 from models import Region, Country
 from schemas import (
     RegionCreate, RegionUpdate, RegionResponse,
     RegionDetailResponse, CountryResponse, MessageResponse
 )
-from config import settings
 
 router = APIRouter(tags=["Regions"])
 
 
-def verify_admin(x_admin_key: Optional[str] = Header(None)):
-    """Verify admin API key for protected endpoints."""
-    if x_admin_key != settings.admin_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid or missing admin API key"
-        )
-    return True
-
-
 @router.get("", response_model=List[RegionResponse])
 def get_regions(
     country_id: Optional[int] = None,
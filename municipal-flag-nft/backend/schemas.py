@@ -1,10 +1,13 @@
 """
 Pydantic schemas for request/response validation.
 """
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Any, List, Optional
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, field_validator
 from models import FlagCategory, NFTStatus, OwnershipType, AuctionStatus
 
 
@@ -14,8 +17,31 @@ from models import FlagCategory, NFTStatus, OwnershipType, AuctionStatus
 
 class BaseSchema(BaseModel):
     """Base schema with common configuration."""
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+_WALLET_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+
+
+def _normalize_wallet(v: str) -> str:
+    """Check a wallet address is 0x + 40 hex digits; return it lowercased."""
+    if not _WALLET_RE.fullmatch(v):
+        raise ValueError("Wallet address must be 0x followed by 40 hex characters")
+    return v.lower()
+
+
+# Wallet address in requests, stored lowercased
+WalletStr = Annotated[str, Field(min_length=42, max_length=42), AfterValidator(_normalize_wallet)]
+
+
+# Amounts in MATIC, bounded to fit the Numeric(18, 8) columns they're
+# stored in (instead of being rounded there)
+Price = Annotated[Decimal, Field(gt=0, max_digits=18, decimal_places=8)]
+
+
+# Detail schemas are declared after the schemas they embed, so sometimes in
+# a later section than their base. Their annotations then refer to real
+# classes: no forward references, and no model_rebuild() at import.
 
 
 # =============================================================================
@@ -46,11 +72,6 @@ class CountryResponse(BaseSchema):
     region_count: Optional[int] = 0
 
 
-class CountryDetailResponse(CountryResponse):
-    """Schema for country detail with regions."""
-    regions: List["RegionResponse"] = []
-
-
 # =============================================================================
 # REGION SCHEMAS
 # =============================================================================
@@ -79,10 +100,9 @@ class RegionResponse(BaseSchema):
     municipality_count: Optional[int] = 0
 
 
-class RegionDetailResponse(RegionResponse):
-    """Schema for region detail with country and municipalities."""
-    country: Optional[CountryResponse] = None
-    municipalities: List["MunicipalityResponse"] = []
+class CountryDetailResponse(CountryResponse):
+    """Schema for country detail with regions."""
+    regions: List[RegionResponse] = []
 
 
 # =============================================================================
@@ -120,10 +140,10 @@ class MunicipalityResponse(BaseSchema):
     flag_count: Optional[int] = 0
 
 
-class MunicipalityDetailResponse(MunicipalityResponse):
-    """Schema for municipality detail with region and flags."""
-    region: Optional[RegionResponse] = None
-    flags: List["FlagResponse"] = []
+class RegionDetailResponse(RegionResponse):
+    """Schema for region detail with country and municipalities."""
+    country: Optional[CountryResponse] = None
+    municipalities: List[MunicipalityResponse] = []
 
 
 # =============================================================================
@@ -138,7 +158,7 @@ class FlagCreate(BaseModel):
     category: FlagCategory = FlagCategory.STANDARD
     image_ipfs_hash: Optional[str] = None
     metadata_ipfs_hash: Optional[str] = None
-    price: Decimal = Decimal("0.01")
+    price: Price = Decimal("0.01")
 
 
 class FlagUpdate(BaseModel):
@@ -148,7 +168,7 @@ class FlagUpdate(BaseModel):
     category: Optional[FlagCategory] = None
     image_ipfs_hash: Optional[str] = None
     metadata_ipfs_hash: Optional[str] = None
-    price: Optional[Decimal] = None
+    price: Optional[Price] = None
 
 
 class FlagResponse(BaseSchema):
@@ -169,11 +189,38 @@ class FlagResponse(BaseSchema):
     interest_count: Optional[int] = 0
 
 
-class FlagDetailResponse(FlagResponse):
-    """Schema for flag detail with municipality and interests."""
-    municipality: Optional[MunicipalityResponse] = None
-    interests: List["FlagInterestResponse"] = []
-    ownerships: List["FlagOwnershipResponse"] = []
+# Prebuilt FlagResponses for the auction lists, which render the same
+# flags over and over. Keyed by (id, updated_at, interest_count): any
+# change to the row bumps updated_at, so stale entries are never hit.
+FLAG_RESPONSE_CACHE_SIZE = 10_000
+_flag_response_cache: "OrderedDict[tuple, FlagResponse]" = OrderedDict()
+_flag_response_lock = threading.Lock()
+
+
+def cached_flag_response(flag: Any) -> Any:
+    """Get the FlagResponse for a Flag ORM object from the LRU cache (other values pass through)."""
+    if flag is None or isinstance(flag, (FlagResponse, dict)):
+        return flag
+
+    key = (flag.id, flag.updated_at, flag.interest_count)
+    with _flag_response_lock:
+        response = _flag_response_cache.get(key)
+        if response is not None:
+            _flag_response_cache.move_to_end(key)
+            return response
+
+    response = FlagResponse.model_validate(flag)
+    with _flag_response_lock:
+        _flag_response_cache[key] = response
+        if len(_flag_response_cache) > FLAG_RESPONSE_CACHE_SIZE:
+            _flag_response_cache.popitem(last=False)
+    return response
+
+
+class MunicipalityDetailResponse(MunicipalityResponse):
+    """Schema for municipality detail with region and flags."""
+    region: Optional[RegionResponse] = None
+    flags: List[FlagResponse] = []
 
 
 # =============================================================================
@@ -182,16 +229,9 @@ class FlagDetailResponse(FlagResponse):
 
 class UserCreate(BaseModel):
     """Schema for creating a user."""
-    wallet_address: str = Field(..., min_length=42, max_length=42)
+    wallet_address: WalletStr
     username: Optional[str] = Field(None, min_length=1, max_length=50)
 
-    @field_validator("wallet_address")
-    @classmethod
-    def validate_wallet(cls, v):
-        if not v.startswith("0x"):
-            raise ValueError("Wallet address must start with 0x")
-        return v.lower()
-
 
 class UserUpdate(BaseModel):
     """Schema for updating a user."""
@@ -210,26 +250,13 @@ class UserResponse(BaseSchema):
     following_count: Optional[int] = 0
 
 
-class UserDetailResponse(UserResponse):
-    """Schema for user detail with owned flags and interests."""
-    ownerships: List["FlagOwnershipResponse"] = []
-    interests: List["FlagInterestResponse"] = []
-
-
 # =============================================================================
 # INTERACTION SCHEMAS
 # =============================================================================
 
 class FlagInterestCreate(BaseModel):
     """Schema for creating a flag interest."""
-    wallet_address: str = Field(..., min_length=42, max_length=42)
-
-    @field_validator("wallet_address")
-    @classmethod
-    def validate_wallet(cls, v):
-        if not v.startswith("0x"):
-            raise ValueError("Wallet address must start with 0x")
-        return v.lower()
+    wallet_address: WalletStr
 
 
 class FlagInterestResponse(BaseSchema):
@@ -252,19 +279,25 @@ class FlagOwnershipResponse(BaseSchema):
     user: Optional[UserResponse] = None
 
 
+class FlagDetailResponse(FlagResponse):
+    """Schema for flag detail with municipality and interests."""
+    municipality: Optional[MunicipalityResponse] = None
+    interests: List[FlagInterestResponse] = []
+    ownerships: List[FlagOwnershipResponse] = []
+
+
+class UserDetailResponse(UserResponse):
+    """Schema for user detail with owned flags and interests."""
+    ownerships: List[FlagOwnershipResponse] = []
+    interests: List[FlagInterestResponse] = []
+
+
 class FlagOwnershipCreate(BaseModel):
     """Schema for recording flag ownership."""
-    wallet_address: str = Field(..., min_length=42, max_length=42)
+    wallet_address: WalletStr
     ownership_type: OwnershipType
     transaction_hash: Optional[str] = None
 
-    @field_validator("wallet_address")
-    @classmethod
-    def validate_wallet(cls, v):
-        if not v.startswith("0x"):
-            raise ValueError("Wallet address must start with 0x")
-        return v.lower()
-
 
 # =============================================================================
 # SOCIAL SCHEMAS
@@ -272,14 +305,7 @@ class FlagOwnershipCreate(BaseModel):
 
 class FollowCreate(BaseModel):
     """Schema for following a user."""
-    target_wallet: str = Field(..., min_length=42, max_length=42)
-
-    @field_validator("target_wallet")
-    @classmethod
-    def validate_wallet(cls, v):
-        if not v.startswith("0x"):
-            raise ValueError("Wallet address must start with 0x")
-        return v.lower()
+    target_wallet: WalletStr
 
 
 class ConnectionResponse(BaseSchema):
@@ -299,17 +325,10 @@ class ConnectionResponse(BaseSchema):
 class AuctionCreate(BaseModel):
     """Schema for creating an auction."""
     flag_id: int
-    wallet_address: str = Field(..., min_length=42, max_length=42)
-    starting_price: Decimal = Field(..., gt=0)
+    wallet_address: WalletStr
+    starting_price: Price
     duration_hours: int = Field(..., ge=1, le=168)  # 1 hour to 7 days
 
-    @field_validator("wallet_address")
-    @classmethod
-    def validate_wallet(cls, v):
-        if not v.startswith("0x"):
-            raise ValueError("Wallet address must start with 0x")
-        return v.lower()
-
 
 class AuctionResponse(BaseSchema):
     """Schema for auction response."""
@@ -326,24 +345,16 @@ class AuctionResponse(BaseSchema):
     seller: Optional[UserResponse] = None
     bid_count: Optional[int] = 0
 
-
-class AuctionDetailResponse(AuctionResponse):
-    """Schema for auction detail with bids."""
-    bids: List["BidResponse"] = []
-    highest_bidder: Optional[UserResponse] = None
+    @field_validator("flag", mode="before")
+    @classmethod
+    def use_cached_flag(cls, v):
+        return cached_flag_response(v)
 
 
 class BidCreate(BaseModel):
     """Schema for placing a bid."""
-    wallet_address: str = Field(..., min_length=42, max_length=42)
-    amount: Decimal = Field(..., gt=0)
-
-    @field_validator("wallet_address")
-    @classmethod
-    def validate_wallet(cls, v):
-        if not v.startswith("0x"):
-            raise ValueError("Wallet address must start with 0x")
-        return v.lower()
+    wallet_address: WalletStr
+    amount: Price
 
 
 class BidResponse(BaseSchema):
@@ -356,6 +367,12 @@ class BidResponse(BaseSchema):
     bidder: Optional[UserResponse] = None
 
 
+class AuctionDetailResponse(AuctionResponse):
+    """Schema for auction detail with bids."""
+    bids: List[BidResponse] = []
+    highest_bidder: Optional[UserResponse] = None
+
+
 # =============================================================================
 # RANKING SCHEMAS
 # =============================================================================
@@ -406,12 +423,3 @@ class ErrorResponse(BaseModel):
     """Error response."""
     detail: str
     success: bool = False
-
-
-# Update forward references
-CountryDetailResponse.model_rebuild()
-RegionDetailResponse.model_rebuild()
-MunicipalityDetailResponse.model_rebuild()
-FlagDetailResponse.model_rebuild()
-UserDetailResponse.model_rebuild()
-AuctionDetailResponse.model_rebuild()
@@ -1,8 +1,20 @@
 """
 Seed database with demo data.
 """
+import csv
+import enum
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+from contextlib import closing
 from decimal import Decimal
+from typing import Optional
+from sqlalchemy import Table, exists, insert, select, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import Session
+from database import Base
 from models import Country, Region, Municipality, Flag, FlagCategory
 from config import settings
 
@@ -178,99 +190,295 @@ DEMO_DATA = {
 }
 
 
+# Seed price per category, converted from the float settings once
+PRICE_BY_CATEGORY = {
+    FlagCategory.STANDARD: Decimal(str(settings.default_standard_price)),
+    FlagCategory.PLUS: Decimal(str(settings.default_plus_price)),
+    FlagCategory.PREMIUM: Decimal(str(settings.default_premium_price)),
+}
+
+
+# Coordinate offsets of a municipality's 8 flags: a 4 x 2 grid, 0.001
+# degrees apart (latitude varies fastest)
+FLAG_OFFSETS = tuple(((i % 4) * 0.001, (i // 4) * 0.001) for i in range(8))
+
+
 def get_price_for_category(category: FlagCategory) -> Decimal:
     """Get price based on category from settings."""
-    if category == FlagCategory.STANDARD:
-        return Decimal(str(settings.default_standard_price))
-    elif category == FlagCategory.PLUS:
-        return Decimal(str(settings.default_plus_price))
-    elif category == FlagCategory.PREMIUM:
-        return Decimal(str(settings.default_premium_price))
-    return Decimal(str(settings.default_standard_price))
+    return PRICE_BY_CATEGORY.get(category, PRICE_BY_CATEGORY[FlagCategory.STANDARD])
+
+
+def _flatten(demo: dict) -> tuple:
+    """
+    Flatten the nested demo data into one list of tuples per table.
+
+    Children refer to their parent by its index in the parent's list:
+    countries (name, code), regions (country_idx, name), municipalities
+    (region_idx, name, latitude, longitude) and flags (municipality_idx,
+    name, location_type, category).
+    """
+    countries, regions, municipalities, flags = [], [], [], []
+    for country_data in demo["countries"]:
+        countries.append((country_data["name"], country_data["code"]))
+        for region_data in country_data["regions"]:
+            regions.append((len(countries) - 1, region_data["name"]))
+            for municipality_data in region_data["municipalities"]:
+                latitude = municipality_data["latitude"]
+                longitude = municipality_data["longitude"]
+                municipalities.append(
+                    (len(regions) - 1, municipality_data["name"], latitude, longitude)
+                )
+                # Flag names are their coordinates: the municipality's,
+                # nudged by the flag's place in the grid (see FLAG_OFFSETS)
+                if len(municipality_data["flags"]) != len(FLAG_OFFSETS):
+                    raise ValueError(
+                        f"{municipality_data['name']} has {len(municipality_data['flags'])} "
+                        f"flags; the coordinate grid fits {len(FLAG_OFFSETS)}"
+                    )
+                flags.extend(
+                    (
+                        len(municipalities) - 1,
+                        f"{latitude + lat_offset:.6f}, {longitude + lon_offset:.6f}",
+                        flag_data["location_type"],
+                        flag_data["category"]
+                    )
+                    for (lat_offset, lon_offset), flag_data
+                    in zip(FLAG_OFFSETS, municipality_data["flags"])
+                )
+    return countries, regions, municipalities, flags
+
+
+# Built once at import; each list maps onto one bulk INSERT
+COUNTRIES, REGIONS, MUNICIPALITIES, FLAGS = _flatten(DEMO_DATA)
+
+
+def copy_rows(db: Session, table: Table, rows: list):
+    """
+    Load rows with PostgreSQL's COPY instead of INSERTs (psycopg2 only).
+
+    COPY bypasses SQLAlchemy, so the columns' Python-side defaults are
+    filled in here and enums are written by name, as the Enum type stores
+    them. Nones become empty CSV fields, which COPY reads as NULL.
+    """
+    defaults = {}
+    for column in table.columns:
+        default = column.default
+        if default is not None and not column.primary_key:
+            defaults[column.name] = default.arg(None) if default.is_callable else default.arg
+
+    columns = list({**defaults, **rows[0]})
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        row = {**defaults, **row}
+        writer.writerow(
+            value.name if isinstance(value, enum.Enum) else value
+            for value in (row[name] for name in columns)
+        )
+    buffer.seek(0)
+
+    preparer = db.bind.dialect.identifier_preparer
+    column_list = ", ".join(preparer.quote(name) for name in columns)
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {preparer.format_table(table)} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def seed_database(db: Session, verbose: bool = False):
+    """
+    Seed the database with demo data.
+
+    One bulk INSERT per level (countries, regions, municipalities, flags)
+    instead of an add/flush per row. Each parent INSERT returns the new ids
+    with the columns that identify the row, so children are matched to their
+    parent by key rather than by the order RETURNING happens to yield.
 
+    Everything runs in the caller's transaction, which the caller commits,
+    so the whole seed is one write transaction.
 
-def seed_database(db: Session):
-    """Seed the database with demo data."""
+    Prints a one-line summary; pass verbose=True to list every row as well.
+    """
     print("🌱 Seeding database with demo data...")
 
-    flag_counter = 0
+    # Countries; ids come back keyed by code
+    ids_by_code = dict(db.execute(
+        insert(Country).returning(Country.code, Country.id),
+        [{"name": name, "code": code} for name, code in COUNTRIES]
+    ).all())
+    country_ids = [ids_by_code[code] for _, code in COUNTRIES]
+    if verbose:
+        for name, _ in COUNTRIES:
+            print(f"  ✅ Created country: {name}")
 
-    for country_data in DEMO_DATA["countries"]:
-        # Create country
-        country = Country(
-            name=country_data["name"],
-            code=country_data["code"]
+    # Regions; ids come back keyed by (country_id, name)
+    region_rows = [
+        {"name": name, "country_id": country_ids[country_idx]}
+        for country_idx, name in REGIONS
+    ]
+    ids_by_key = {
+        (country_id, name): region_id
+        for region_id, country_id, name in db.execute(
+            insert(Region).returning(Region.id, Region.country_id, Region.name),
+            region_rows
         )
-        db.add(country)
-        db.flush()  # Get the ID
-        print(f"  ✅ Created country: {country.name}")
+    }
+    region_ids = [ids_by_key[(row["country_id"], row["name"])] for row in region_rows]
+    if verbose:
+        for _, name in REGIONS:
+            print(f"    ✅ Created region: {name}")
 
-        for region_data in country_data["regions"]:
-            # Create region
-            region = Region(
-                name=region_data["name"],
-                country_id=country.id
-            )
-            db.add(region)
-            db.flush()
-            print(f"    ✅ Created region: {region.name}")
+    # Municipalities; ids come back keyed by (region_id, name)
+    municipality_rows = [
+        {
+            "name": name,
+            "region_id": region_ids[region_idx],
+            "latitude": latitude,
+            "longitude": longitude
+        }
+        for region_idx, name, latitude, longitude in MUNICIPALITIES
+    ]
+    ids_by_key = {
+        (region_id, name): municipality_id
+        for municipality_id, region_id, name in db.execute(
+            insert(Municipality).returning(
+                Municipality.id, Municipality.region_id, Municipality.name
+            ),
+            municipality_rows
+        )
+    }
+    municipality_ids = [
+        ids_by_key[(row["region_id"], row["name"])] for row in municipality_rows
+    ]
+    if verbose:
+        for _, name, _, _ in MUNICIPALITIES:
+            print(f"      ✅ Created municipality: {name}")
 
-            for municipality_data in region_data["municipalities"]:
-                # Create municipality
-                municipality = Municipality(
-                    name=municipality_data["name"],
-                    region_id=region.id,
-                    latitude=municipality_data["latitude"],
-                    longitude=municipality_data["longitude"]
-                )
-                db.add(municipality)
-                db.flush()
-                print(f"      ✅ Created municipality: {municipality.name}")
-
-                for i, flag_data in enumerate(municipality_data["flags"]):
-                    flag_counter += 1
-                    # Create flag with coordinates as name
-                    # Add slight offset to coordinates for each flag
-                    lat_offset = (i % 4) * 0.001
-                    lon_offset = (i // 4) * 0.001
-                    flag_lat = municipality_data["latitude"] + lat_offset
-                    flag_lon = municipality_data["longitude"] + lon_offset
-
-                    flag = Flag(
-                        municipality_id=municipality.id,
-                        name=f"{flag_lat:.6f}, {flag_lon:.6f}",
-                        location_type=flag_data["location_type"],
-                        category=flag_data["category"],
-                        price=get_price_for_category(flag_data["category"])
-                    )
-                    db.add(flag)
+    # Flags - nothing references them here, so no RETURNING (or COPY)
+    flag_rows = [
+        {
+            "municipality_id": municipality_ids[municipality_idx],
+            "name": name,
+            "location_type": location_type,
+            "category": category,
+            "price": PRICE_BY_CATEGORY[category]
+        }
+        for municipality_idx, name, location_type, category in FLAGS
+    ]
+
+    if db.bind.dialect.driver == "psycopg2":
+        # The bulk of the rows: COPY them in rather than binding parameters
+        copy_rows(db, Flag.__table__, flag_rows)
+    else:
+        db.execute(insert(Flag), flag_rows)
+    if verbose:
+        for _, name, _, _ in MUNICIPALITIES:
+            print(f"        ✅ Created {len(FLAG_OFFSETS)} flags for {name}")
 
-                print(f"        ✅ Created 8 flags for {municipality.name}")
+    print(
+        f"🎉 Seeding complete! Created {len(country_ids)} countries, "
+        f"{len(region_ids)} regions, {len(municipality_ids)} municipalities "
+        f"and {len(flag_rows)} flags."
+    )
 
-    db.commit()
-    print(f"\n🎉 Seeding complete! Created {flag_counter} flags total.")
 
+def seed_snapshot_path() -> Optional[str]:
+    """
+    Path of the seeded-database snapshot, or None if there can't be one.
 
-def run_seed():
-    """Run seed as standalone script."""
+    Only SQLite file databases are snapshotted. The file name carries a hash
+    of the demo data, prices and table definitions, so changing any of them
+    makes run_seed seed afresh instead of restoring an outdated copy.
+    """
+    url = make_url(settings.database_url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+
+    schema = [
+        (table.name, [(column.name, str(column.type)) for column in table.columns])
+        for table in Base.metadata.sorted_tables
+    ]
+    fingerprint = hashlib.sha1(
+        repr((DEMO_DATA, PRICE_BY_CATEGORY, schema)).encode()
+    ).hexdigest()[:12]
+    root, ext = os.path.splitext(url.database)
+    return f"{root}.seed-{fingerprint}{ext or '.db'}"
+
+
+def run_seed(verbose: bool = False):
+    """
+    Run seed as standalone script (`python seed_data.py [-v]`).
+
+    The first seed of a SQLite file database is saved to a snapshot next to
+    it (see seed_snapshot_path). Later runs against an empty database copy
+    the snapshot in with SQLite's backup API instead of seeding again.
+    """
     from database import SessionLocal, init_db
 
     # Initialize database
     init_db()
+    snapshot = seed_snapshot_path()
+
+    # Create session and seed, all in one transaction (committed on exit)
+    with SessionLocal() as db, db.begin():
+        if db.bind.dialect.name == "sqlite":
+            # One-off load into a fresh file: keep the rollback journal in
+            # memory and don't fsync per write (set before the transaction's
+            # first write, while pysqlite hasn't issued BEGIN yet)
+            db.execute(text("PRAGMA journal_mode=MEMORY"))
+            db.execute(text("PRAGMA synchronous=OFF"))
 
-    # Create session and seed
-    db = SessionLocal()
-    try:
         # Check if already seeded
-        existing = db.query(Country).count()
-        if existing > 0:
+        if db.scalar(select(exists().select_from(Country))):
             print("⚠️  Database already has data. Skipping seed.")
             return
 
-        seed_database(db)
-    finally:
-        db.close()
+        # The snapshot is a copy of the whole database, so it's only
+        # restored into (or taken from) one with no other data either
+        if snapshot and any(
+            db.scalar(select(exists().select_from(table)))
+            for table in Base.metadata.sorted_tables
+        ):
+            snapshot = None
+
+        if snapshot and os.path.exists(snapshot):
+            # Nothing has been written yet, so no BEGIN has been issued
+            # and the backup can replace the database pages directly
+            with closing(sqlite3.connect(snapshot)) as source:
+                source.backup(db.connection().connection.driver_connection)
+            print(f"🌱 Restored demo data from {snapshot}")
+            return
+
+        # Build the seeded tables' secondary indexes once at the end rather
+        # than row by row. Unique ones stay, since they enforce constraints.
+        # (SQLite runs DDL outside the transaction; if the seed fails, the
+        # next init_db() recreates whatever is missing.)
+        deferred_indexes = [
+            index
+            for model in (Country, Region, Municipality, Flag)
+            for index in model.__table__.indexes
+            if not index.unique
+        ]
+        connection = db.connection()
+        for index in deferred_indexes:
+            index.drop(connection, checkfirst=True)
+
+        seed_database(db, verbose=verbose)
+
+        for index in deferred_indexes:
+            index.create(connection, checkfirst=True)
+
+    if snapshot:
+        database_path = make_url(settings.database_url).database
+        with closing(sqlite3.connect(database_path)) as source, \
+                closing(sqlite3.connect(snapshot)) as target:
+            source.backup(target)
+        print(f"💾 Saved seeded database to {snapshot}")
 
 
 if __name__ == "__main__":
-    run_seed()
+    run_seed(verbose="-v" in sys.argv[1:])